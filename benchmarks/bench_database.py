@@ -0,0 +1,549 @@
+"""Measure the latency of theticketbot's database queries on large datasets.
+
+Usage::
+
+    python benchmarks/bench_database.py [--tickets N [N ...]] [-n ITERATIONS]
+        [--data-dir DIRECTORY] [--output FILE] [--compare FILE]
+
+Every :class:`~theticketbot.database.DatabaseClient` method is benchmarked,
+along with the queries made directly by the cogs. Each benchmark runs
+inside a transaction that is rolled back afterwards, so write benchmarks
+don't affect the others. As a result, write latencies exclude the cost of
+committing, such as syncing the WAL to disk, and should only be compared
+between runs of this benchmark.
+
+Datasets are generated once per ticket count and reused if ``--data-dir``
+is given. Results are written as JSON, and can be compared with a previous
+run using ``--compare``.
+
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import itertools
+import json
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, NamedTuple
+
+import asqlite
+from stats import summarize
+
+from theticketbot.database import DatabaseClient, connect
+from theticketbot.dataset import DatasetOptions, generate_dataset
+
+DEFAULT_TICKETS = (10_000, 1_000_000, 10_000_000)
+
+# IDs created by write benchmarks start here to avoid conflicting with the dataset
+NEW_ID_START = 2**60
+
+
+class TicketSample(NamedTuple):
+    id: int
+    inbox_id: int
+    owner_id: int
+    guild_id: int
+
+
+class Samples(NamedTuple):
+    """Randomly selected rows from a dataset for benchmarks to query."""
+
+    tickets: list[TicketSample]
+    inboxes: list[int]
+    messages: list[int]
+    guilds: list[int]
+
+
+class BenchmarkContext:
+    def __init__(self, conn: asqlite.Connection, samples: Samples, seed: int) -> None:
+        self.conn = conn
+        self.query = DatabaseClient(conn)
+        self.samples = samples
+        self.random = random.Random(seed)
+        self._new_ids = itertools.count(NEW_ID_START)
+
+    def new_id(self) -> int:
+        return next(self._new_ids)
+
+    def ticket(self) -> TicketSample:
+        return self.random.choice(self.samples.tickets)
+
+    def inbox(self) -> int:
+        return self.random.choice(self.samples.inboxes)
+
+
+Operation = Callable[[BenchmarkContext], Awaitable[Any]]
+
+
+class Benchmark(NamedTuple):
+    name: str
+    operation: Operation
+    iterations: int | None = None
+    """Overrides the number of iterations for expensive operations."""
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(
+    name: str,
+    *,
+    iterations: int | None = None,
+) -> Callable[[Operation], Operation]:
+    def decorator(operation: Operation) -> Operation:
+        BENCHMARKS.append(Benchmark(name, operation, iterations))
+        return operation
+
+    return decorator
+
+
+# DatabaseClient methods
+
+
+@benchmark("add_user")
+async def bench_add_user(ctx: BenchmarkContext) -> None:
+    await ctx.query.add_user(ctx.new_id())
+
+
+@benchmark("add_guild")
+async def bench_add_guild(ctx: BenchmarkContext) -> None:
+    await ctx.query.add_guild(ctx.new_id())
+
+
+@benchmark("add_member")
+async def bench_add_member(ctx: BenchmarkContext) -> None:
+    await ctx.query.add_member(ctx.new_id(), ctx.ticket().guild_id)
+
+
+@benchmark("add_member (existing)")
+async def bench_add_member_existing(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.query.add_member(ticket.owner_id, ticket.guild_id)
+
+
+@benchmark("add_user_or_member")
+async def bench_add_user_or_member(ctx: BenchmarkContext) -> None:
+    await ctx.query.add_user_or_member(ctx.new_id(), guild_id=ctx.ticket().guild_id)
+
+
+@benchmark("add_channel")
+async def bench_add_channel(ctx: BenchmarkContext) -> None:
+    await ctx.query.add_channel(ctx.new_id(), guild_id=ctx.ticket().guild_id)
+
+
+@benchmark("add_message")
+async def bench_add_message(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.query.add_message(ctx.new_id(), ticket.id, guild_id=ticket.guild_id)
+
+
+@benchmark("add_inbox")
+async def bench_add_inbox(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.query.add_inbox(ctx.new_id(), ticket.id, guild_id=ticket.guild_id)
+
+
+@benchmark("get_inbox_starter_content")
+async def bench_get_inbox_starter_content(ctx: BenchmarkContext) -> None:
+    await ctx.query.get_inbox_starter_content(ctx.inbox())
+
+
+@benchmark("set_inbox_starter_content")
+async def bench_set_inbox_starter_content(ctx: BenchmarkContext) -> None:
+    await ctx.query.set_inbox_starter_content(ctx.inbox(), "Hello $author!")
+
+
+@benchmark("get_inbox_default_ticket_name")
+async def bench_get_inbox_default_ticket_name(ctx: BenchmarkContext) -> None:
+    await ctx.query.get_inbox_default_ticket_name(ctx.inbox())
+
+
+@benchmark("set_inbox_default_ticket_name")
+async def bench_set_inbox_default_ticket_name(ctx: BenchmarkContext) -> None:
+    await ctx.query.set_inbox_default_ticket_name(ctx.inbox(), "$counter-$author")
+
+
+@benchmark("increment_inbox_counter")
+async def bench_increment_inbox_counter(ctx: BenchmarkContext) -> None:
+    await ctx.query.increment_inbox_counter(ctx.inbox())
+
+
+@benchmark("get_inbox_destination")
+async def bench_get_inbox_destination(ctx: BenchmarkContext) -> None:
+    await ctx.query.get_inbox_destination(ctx.inbox())
+
+
+@benchmark("set_inbox_destination")
+async def bench_set_inbox_destination(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.query.set_inbox_destination(
+        ticket.inbox_id,
+        ticket.id,
+        guild_id=ticket.guild_id,
+    )
+
+
+@benchmark("add_inbox_staff")
+async def bench_add_inbox_staff(ctx: BenchmarkContext) -> None:
+    await ctx.query.add_inbox_staff(ctx.inbox(), f"<@&{ctx.new_id()}>")
+
+
+@benchmark("get_inbox_staff")
+async def bench_get_inbox_staff(ctx: BenchmarkContext) -> None:
+    await ctx.query.get_inbox_staff(ctx.inbox())
+
+
+@benchmark("remove_inbox_staff")
+async def bench_remove_inbox_staff(ctx: BenchmarkContext) -> None:
+    await ctx.query.remove_inbox_staff(ctx.inbox(), f"<@{ctx.ticket().owner_id}>")
+
+
+@benchmark("add_ticket")
+async def bench_add_ticket(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.query.add_ticket(
+        ticket_id=ctx.new_id(),
+        inbox_id=ticket.inbox_id,
+        owner_id=ticket.owner_id,
+        guild_id=ticket.guild_id,
+    )
+
+
+@benchmark("count_matching_tickets")
+async def bench_count_matching_tickets(ctx: BenchmarkContext) -> None:
+    ticket_ids = [ctx.ticket().id for _ in range(10)]
+    await ctx.query.count_matching_tickets(ticket_ids)
+
+
+@benchmark("get_setting")
+async def bench_get_setting(ctx: BenchmarkContext) -> None:
+    await ctx.query.get_setting("last-sync-hash")
+
+
+@benchmark("set_setting")
+async def bench_set_setting(ctx: BenchmarkContext) -> None:
+    await ctx.query.set_setting("bench", ctx.new_id())
+
+
+@benchmark("delete_setting")
+async def bench_delete_setting(ctx: BenchmarkContext) -> None:
+    await ctx.query.delete_setting("bench")
+
+
+# Inline queries from the cogs
+
+
+@benchmark("inbox exists (create ticket)")
+async def bench_inbox_exists(ctx: BenchmarkContext) -> None:
+    await ctx.conn.fetchone("SELECT 1 FROM inbox WHERE id = ?", ctx.inbox())
+
+
+@benchmark("get_active_user_tickets")
+async def bench_get_active_user_tickets(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.conn.fetchall(
+        "SELECT id FROM ticket WHERE inbox_id = ? AND owner_id = ?",
+        ticket.inbox_id,
+        ticket.owner_id,
+    )
+
+
+@benchmark("get_max_tickets")
+async def bench_get_max_tickets(ctx: BenchmarkContext) -> None:
+    await ctx.conn.fetchone(
+        "SELECT max_tickets_per_user FROM inbox WHERE id = ?",
+        ctx.inbox(),
+    )
+
+
+@benchmark("ticket owner (thread member remove)")
+async def bench_ticket_owner(ctx: BenchmarkContext) -> None:
+    await ctx.conn.fetchone("SELECT owner_id FROM ticket WHERE id = ?", ctx.ticket().id)
+
+
+@benchmark("member remove JOIN")
+async def bench_member_remove_join(ctx: BenchmarkContext) -> None:
+    ticket = ctx.ticket()
+    await ctx.conn.fetchall(
+        "SELECT ticket.id FROM ticket "
+        "JOIN inbox ON inbox.id = inbox_id "
+        "JOIN message ON message.id = inbox.id "
+        "JOIN channel ON channel.id = channel_id "
+        "JOIN guild ON guild.id = guild_id "
+        "WHERE guild_id = ? AND owner_id = ?",
+        ticket.guild_id,
+        ticket.owner_id,
+    )
+
+
+@benchmark("ticket exists (thread update)")
+async def bench_ticket_exists(ctx: BenchmarkContext) -> None:
+    await ctx.conn.fetchone("SELECT 1 FROM ticket WHERE id = ?", ctx.ticket().id)
+
+
+@benchmark("delete channel (ticket)")
+async def bench_delete_ticket_channel(ctx: BenchmarkContext) -> None:
+    await ctx.conn.execute("DELETE FROM channel WHERE id = ?", ctx.ticket().id)
+
+
+@benchmark("delete message (unknown)")
+async def bench_delete_unknown_message(ctx: BenchmarkContext) -> None:
+    await ctx.conn.execute("DELETE FROM message WHERE id = ?", ctx.new_id())
+
+
+@benchmark("delete message (inbox)", iterations=100)
+async def bench_delete_inbox_message(ctx: BenchmarkContext) -> None:
+    message_id = ctx.random.choice(ctx.samples.messages)
+    await ctx.conn.execute("DELETE FROM message WHERE id = ?", message_id)
+
+
+@benchmark("bulk delete messages (100)")
+async def bench_bulk_delete_messages(ctx: BenchmarkContext) -> None:
+    await ctx.conn.executemany(
+        "DELETE FROM message WHERE id = ?",
+        [(ctx.new_id(),) for _ in range(100)],
+    )
+
+
+@benchmark("cleanup guilds", iterations=3)
+async def bench_cleanup_guilds(ctx: BenchmarkContext) -> None:
+    # Simulate the bot having left 1% of its guilds, and at least one
+    n_left = max(1, len(ctx.samples.guilds) // 100)
+    left = set(ctx.random.sample(ctx.samples.guilds, n_left))
+
+    rows = await ctx.conn.fetchall("SELECT id FROM guild")
+    to_delete = [(row[0],) for row in rows if row[0] in left]
+    await ctx.conn.executemany("DELETE FROM guild WHERE id = ?", to_delete)
+
+
+# Datasets
+
+
+def create_dataset(path: Path, tickets: int, *, seed: int) -> None:
+    """Generate a database with roughly the given number of tickets."""
+    options = DatasetOptions(
+        guilds=max(1, tickets // 1000),
+        members_per_guild=500,
+        tickets_per_owner=2,
+        seed=seed,
+    )
+    with contextlib.closing(sqlite3.connect(path)) as conn:
+        generate_dataset(conn, options)
+
+
+def get_dataset(directory: Path, tickets: int, *, seed: int) -> Path:
+    path = directory / f"bench-database-{tickets}.db"
+    if path.exists():
+        return path
+
+    print(f"Generating dataset with {tickets:,} tickets...")
+    start = time.perf_counter()
+    partial = path.with_suffix(".partial")
+    partial.unlink(missing_ok=True)
+    create_dataset(partial, tickets, seed=seed)
+    partial.rename(path)
+    print(f"Generated dataset in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+async def load_samples(conn: asqlite.Connection, n: int, *, seed: int) -> Samples:
+    """Select random rows from each table by seeking to random row IDs."""
+    rng = random.Random(seed)
+
+    async def sample(sql: str, table: str) -> list[Any]:
+        row = await conn.fetchone(f"SELECT min(rowid), max(rowid) FROM {table}")
+        assert row is not None
+        low, high = row
+        if low is None:
+            return []
+
+        rows = []
+        for _ in range(n):
+            row = await conn.fetchone(sql, rng.randint(low, high))
+            if row is not None:
+                rows.append(tuple(row))
+        return rows
+
+    tickets = await sample(
+        "SELECT ticket.id, inbox_id, owner_id, guild_id FROM ticket "
+        "JOIN channel ON channel.id = ticket.id "
+        "WHERE ticket.rowid >= ? ORDER BY ticket.rowid LIMIT 1",
+        "ticket",
+    )
+    inboxes = await sample(
+        "SELECT id FROM inbox WHERE rowid >= ? ORDER BY rowid LIMIT 1",
+        "inbox",
+    )
+    guilds = await conn.fetchall("SELECT id FROM guild")
+
+    return Samples(
+        tickets=[TicketSample(*row) for row in tickets],
+        inboxes=[row[0] for row in inboxes],
+        messages=[row[0] for row in inboxes],
+        guilds=[row[0] for row in guilds],
+    )
+
+
+# Runner
+
+
+async def run_benchmark(
+    conn: asqlite.Connection,
+    benchmark: Benchmark,
+    samples: Samples,
+    *,
+    iterations: int,
+    max_time: float,
+    seed: int,
+) -> list[float]:
+    ctx = BenchmarkContext(conn, samples, seed)
+    iterations = benchmark.iterations or iterations
+    latencies: list[float] = []
+
+    await conn.execute("BEGIN")
+    try:
+        deadline = time.perf_counter() + max_time
+        for _ in range(iterations):
+            start = time.perf_counter()
+            await benchmark.operation(ctx)
+            end = time.perf_counter()
+
+            latencies.append(end - start)
+            if end > deadline:
+                break
+    finally:
+        await conn.execute("ROLLBACK")
+
+    return latencies
+
+
+async def run_dataset(path: Path, tickets: int, args: argparse.Namespace) -> list[dict]:
+    results = []
+
+    async with connect(str(path)) as conn:
+        samples = await load_samples(conn, 1000, seed=args.seed)
+
+        print(f"\n{tickets:,} tickets (writes are rolled back, excluding commit time)")
+        print(f"{'Benchmark':<40} {'Ops':>6} {'Ops/s':>10} {'p50':>9} {'p99':>9}")
+        for benchmark in BENCHMARKS:
+            if args.filter and args.filter not in benchmark.name:
+                continue
+
+            latencies = await run_benchmark(
+                conn,
+                benchmark,
+                samples,
+                iterations=args.iterations,
+                max_time=args.max_time,
+                seed=args.seed,
+            )
+            summary = summarize(latencies)
+            ops_per_sec = len(latencies) / sum(latencies)
+            results.append(
+                {
+                    "tickets": tickets,
+                    "benchmark": benchmark.name,
+                    "ops": len(latencies),
+                    "ops_per_sec": ops_per_sec,
+                    **{k: v for k, v in summary.items() if k != "count"},
+                }
+            )
+            print(
+                f"{benchmark.name:<40} {len(latencies):>6} {ops_per_sec:>10,.0f} "
+                f"{summary['p50'] * 1000:>7.3f}ms {summary['p99'] * 1000:>7.3f}ms"
+            )
+
+    return results
+
+
+def print_comparison(results: list[dict], baseline_path: Path) -> None:
+    with baseline_path.open(encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    previous = {
+        (result["tickets"], result["benchmark"]): result
+        for result in baseline["results"]
+    }
+
+    print(f"\nCompared to {baseline_path}")
+    print(f"{'Benchmark':<40} {'Tickets':>11} {'Ops/s':>8} {'p99':>8}")
+    for result in results:
+        old = previous.get((result["tickets"], result["benchmark"]))
+        if old is None:
+            continue
+
+        ops_change = result["ops_per_sec"] / old["ops_per_sec"] - 1
+        p99_change = result["p99"] / old["p99"] - 1
+        print(
+            f"{result['benchmark']:<40} {result['tickets']:>11,} "
+            f"{ops_change:>+8.1%} {p99_change:>+8.1%}"
+        )
+
+
+async def run(args: argparse.Namespace, data_dir: Path) -> list[dict]:
+    results = []
+    for tickets in args.tickets:
+        path = await asyncio.to_thread(get_dataset, data_dir, tickets, seed=args.seed)
+        results.extend(await run_dataset(path, tickets, args))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("--tickets", default=DEFAULT_TICKETS, nargs="+", type=int)
+    parser.add_argument("-n", "--iterations", default=1000, type=int)
+    parser.add_argument(
+        "--max-time",
+        default=10.0,
+        type=float,
+        help="The maximum number of seconds to spend on each benchmark",
+    )
+    parser.add_argument(
+        "--filter",
+        help="Only run benchmarks containing this string",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        help="The directory to store generated datasets in for reuse",
+    )
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="A previous JSON output")
+    parser.add_argument("--seed", default=0, type=int)
+    args = parser.parse_args()
+
+    now = datetime.datetime.now()
+    output: Path = args.output or Path(
+        f"bench-database-{now.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir: Path = args.data_dir or Path(temp_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        results = asyncio.run(run(args, data_dir))
+
+    report = {
+        "created": now.astimezone().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "iterations": args.iterations,
+        "seed": args.seed,
+        "results": results,
+    }
+    with output.open("w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults written to {output}")
+
+    if args.compare is not None:
+        print_comparison(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
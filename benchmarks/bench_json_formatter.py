@@ -0,0 +1,102 @@
+"""Measure the throughput of theticketbot's JSON log formatter.
+
+Usage::
+
+    python benchmarks/bench_json_formatter.py [-n RECORDS]
+
+The previous implementation of the formatter is included as a baseline.
+
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import sys
+import time
+from typing import Any
+
+from theticketbot.logging import LOG_RECORD_ATTRIBUTES, JSONFormatter
+
+
+class BaselineJSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {}
+
+        for k, v in vars(record).items():
+            if k not in LOG_RECORD_ATTRIBUTES:
+                data[k] = v
+
+        created = datetime.datetime.fromtimestamp(
+            record.created,
+            tz=datetime.timezone.utc,
+        )
+
+        data["created"] = created.isoformat()
+        data["level"] = record.levelname
+        data["name"] = record.name
+        data["message"] = record.getMessage()
+        return json.dumps(data, default=str)
+
+
+def make_records(n: int) -> dict[str, list[logging.LogRecord]]:
+    logger = logging.getLogger("discord.gateway")
+    start = time.time()
+
+    def make(i: int, extra: dict[str, Any] | None) -> logging.LogRecord:
+        record = logger.makeRecord(
+            logger.name,
+            logging.DEBUG,
+            __file__,
+            0,
+            "Shard ID %s has received event %s",
+            (None, "MESSAGE_CREATE"),
+            None,
+            extra=extra,
+        )
+        record.created = start + i / 1000
+        return record
+
+    return {
+        "plain": [make(i, None) for i in range(n)],
+        "extra": [make(i, {"guild_id": i, "user_id": i * 2}) for i in range(n)],
+    }
+
+
+def bench(formatter: logging.Formatter, records: list[logging.LogRecord]) -> float:
+    start = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("-n", "--records", default=100_000, type=int)
+    args = parser.parse_args()
+
+    formatters = {
+        "baseline": BaselineJSONFormatter(),
+        "current": JSONFormatter(),
+    }
+
+    try:
+        import orjson
+    except ImportError:
+        print("orjson is not installed, using the standard json module")
+    else:
+        print(f"Using orjson {orjson.__version__}")
+
+    for kind, records in make_records(args.records).items():
+        for name, formatter in formatters.items():
+            elapsed = bench(formatter, records)
+            rate = len(records) / elapsed
+            print(
+                f"{kind:<6} {name:<9} {elapsed:7.3f}s "
+                f"{rate:>12,.0f} records/s "
+                f"{elapsed / len(records) * 1e6:6.2f}us/record"
+            )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,584 @@
+"""A simulated Discord API for running theticketbot offline.
+
+:class:`FakeDiscord` replaces the bot's HTTP client and interaction
+webhook adapter with in-memory handlers, which respond after a configurable
+latency and occasionally with a 429 to exercise discord.py's ratelimit
+handling. Gateway events are fed directly into the bot's connection state,
+so the real cogs, views, and command tree handle them as they would in
+production.
+
+This module is shared by the benchmarks in this directory and isn't
+meant to be run directly.
+
+"""
+
+import asyncio
+import collections
+import contextlib
+import itertools
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, NamedTuple, cast
+
+import discord
+import discord.http
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+from theticketbot.bot import Bot, StartupFlags
+from theticketbot.config import load_config
+from theticketbot.database import DatabaseClient
+
+if TYPE_CHECKING:
+    from discord.types.guild import Guild as GuildPayload
+
+ADMINISTRATOR = str(discord.Permissions.all().value)
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+_WEBHOOK_PATH_PATTERN = re.compile(r"/(?:interactions|webhooks)/(\d+)/")
+
+Handler = Callable[[discord.http.Route, Any], Any]
+
+
+class HTTPProfile(NamedTuple):
+    """Describes how the fake API responds to requests."""
+
+    latency: float = 0.05
+    """The mean number of seconds each request takes."""
+    jitter: float = 0.02
+    """The standard deviation of each request's latency."""
+    ratelimit_chance: float = 0.0
+    """The probability of each request being ratelimited."""
+    retry_after: float = 1.0
+    """The number of seconds to wait after being ratelimited."""
+
+
+class RouteStats:
+    __slots__ = ("requests", "ratelimited", "latencies")
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.ratelimited = 0
+        self.latencies: list[float] = []
+
+
+class FakeDiscord:
+    """An in-memory stand-in for Discord's HTTP API and gateway.
+
+    :param profile: The latency and ratelimit behaviour of the API.
+    :param seed: The seed used for latencies and ratelimits.
+
+    """
+
+    def __init__(self, profile: HTTPProfile = HTTPProfile(), *, seed: int = 0) -> None:
+        self.profile = profile
+        self.random = random.Random(seed)
+        self._first_id = discord.utils.time_snowflake(discord.utils.utcnow())
+        self._ids = itertools.count()
+        self.stats: collections.defaultdict[str, RouteStats] = collections.defaultdict(
+            RouteStats
+        )
+
+        self.bot_user = make_user(self.next_id(), "theticketbot", bot=True)
+        self.application_id = int(self.bot_user["id"])
+        self.threads: dict[int, dict[str, Any]] = {}
+        """The payloads of threads created by or given to the fake API."""
+        self._bot: Bot | None = None
+
+        self._handlers: dict[tuple[str, str], Handler] = {
+            ("GET", "/users/@me"): lambda route, payload: self.bot_user,
+            ("GET", "/oauth2/applications/@me"): self._get_application,
+            ("PUT", "/applications/{application_id}/commands"): self._sync_commands,
+            ("POST", "/channels/{channel_id}/threads"): self._create_thread,
+            ("POST", "/channels/{channel_id}/messages"): self._send_message,
+            ("PATCH", "/channels/{channel_id}"): self._edit_channel,
+            (
+                "POST",
+                "/interactions/{webhook_id}/{webhook_token}/callback",
+            ): self._create_interaction_response,
+            (
+                "PATCH",
+                "/webhooks/{webhook_id}/{webhook_token}/messages/@original",
+            ): self._edit_original_response,
+            (
+                "POST",
+                "/webhooks/{webhook_id}/{webhook_token}",
+            ): self._send_followup,
+        }
+
+    # Snowflakes
+
+    def next_id(self) -> int:
+        """Return a new, unique snowflake."""
+        return self._first_id + next(self._ids)
+
+    # Installation
+
+    def attach(self, bot: Bot) -> None:
+        """Replace the bot's HTTP client and webhook adapter with this API.
+
+        The webhook adapter is stored in a context variable,
+        so this must be called before any tasks using it are created.
+
+        """
+        self._bot = bot
+        bot.http.request = self.request  # type: ignore
+        async_context.set(FakeWebhookAdapter(self))
+
+    @property
+    def bot(self) -> Bot:
+        assert self._bot is not None
+        return self._bot
+
+    def dispatch(self, event: str, data: Any) -> None:
+        """Feed a gateway event into the bot's connection state."""
+        self.bot._connection.parsers[event](data)
+
+    # Requests
+
+    async def request(
+        self,
+        route: discord.http.Route,
+        *,
+        files: Any = None,
+        form: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        stats = self.stats[f"{route.method} {route.path}"]
+        stats.requests += 1
+        start = time.perf_counter()
+
+        while True:
+            await asyncio.sleep(self._get_latency())
+            if self.random.random() >= self.profile.ratelimit_chance:
+                break
+
+            # discord.py would sleep and retry the request itself
+            stats.ratelimited += 1
+            await asyncio.sleep(self.profile.retry_after)
+
+        stats.latencies.append(time.perf_counter() - start)
+
+        handler = self._handlers.get((route.method, route.path))
+        if handler is None:
+            return {}
+        return handler(route, kwargs.get("json", kwargs.get("payload")))
+
+    def _get_latency(self) -> float:
+        latency = self.random.gauss(self.profile.latency, self.profile.jitter)
+        return max(latency, 0.0)
+
+    # Handlers
+
+    def _get_application(self, route: discord.http.Route, payload: Any) -> Any:
+        return {
+            "id": str(self.application_id),
+            "name": "theticketbot",
+            "icon": None,
+            "description": "",
+            "bot_public": True,
+            "bot_require_code_grant": False,
+            "verify_key": "",
+            "flags": 0,
+            "owner": self.bot_user,
+            "team": None,
+        }
+
+    def _sync_commands(self, route: discord.http.Route, payload: Any) -> Any:
+        return []
+
+    def _create_thread(self, route: discord.http.Route, payload: Any) -> Any:
+        assert route.channel_id is not None
+        channel = self.bot.get_channel(int(route.channel_id))
+        assert isinstance(channel, discord.TextChannel)
+
+        thread = make_thread(
+            self.next_id(),
+            channel.guild.id,
+            channel.id,
+            owner_id=self.application_id,
+            name=payload.get("name", "ticket"),
+        )
+        self.threads[int(thread["id"])] = thread
+        self.dispatch("THREAD_CREATE", {**thread, "newly_created": True})
+        return thread
+
+    def _send_message(self, route: discord.http.Route, payload: Any) -> Any:
+        assert route.channel_id is not None
+        return make_message(
+            self.next_id(),
+            int(route.channel_id),
+            self.bot_user,
+            content=(payload or {}).get("content", ""),
+        )
+
+    def _edit_channel(self, route: discord.http.Route, payload: Any) -> Any:
+        assert route.channel_id is not None
+        thread = self.threads.get(int(route.channel_id))
+        if thread is None:
+            return {"id": str(route.channel_id), "type": 0}
+
+        metadata = thread["thread_metadata"]
+        for key in ("archived", "locked"):
+            if key in payload:
+                metadata[key] = payload[key]
+
+        self.dispatch("THREAD_UPDATE", thread)
+        return thread
+
+    def _create_interaction_response(
+        self,
+        route: discord.http.Route,
+        payload: Any,
+    ) -> Any:
+        interaction_id = _get_webhook_id(route)
+        return {
+            "interaction": {
+                "id": str(interaction_id),
+                "type": 3,
+                "response_message_id": str(self.next_id()),
+                "response_message_loading": False,
+                "response_message_ephemeral": True,
+            },
+        }
+
+    def _edit_original_response(self, route: discord.http.Route, payload: Any) -> Any:
+        return make_message(
+            self.next_id(),
+            0,
+            self.bot_user,
+            content=(payload or {}).get("content", ""),
+        )
+
+    def _send_followup(self, route: discord.http.Route, payload: Any) -> Any:
+        return self._edit_original_response(route, payload)
+
+
+class FakeWebhookAdapter(AsyncWebhookAdapter):
+    """Sends interaction responses and followups to a :class:`FakeDiscord`."""
+
+    def __init__(self, fake: FakeDiscord) -> None:
+        super().__init__()
+        self.fake = fake
+
+    async def request(  # type: ignore
+        self,
+        route: discord.http.Route,
+        session: Any,
+        *,
+        payload: Any = None,
+        **kwargs: Any,
+    ) -> Any:
+        return await self.fake.request(route, payload=payload)
+
+
+def _get_webhook_id(route: discord.http.Route) -> int:
+    m = _WEBHOOK_PATH_PATTERN.search(route.url)
+    assert m is not None
+    return int(m[1])
+
+
+# Payloads
+
+
+def make_user(user_id: int, name: str, *, bot: bool = False) -> dict[str, Any]:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def make_member(user: dict[str, Any], roles: list[int] = []) -> dict[str, Any]:
+    return {
+        "user": user,
+        "roles": [str(role_id) for role_id in roles],
+        "joined_at": TIMESTAMP,
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def make_role(role_id: int, name: str, permissions: str = "0") -> dict[str, Any]:
+    return {
+        "id": str(role_id),
+        "name": name,
+        "permissions": permissions,
+        "position": 0,
+        "color": 0,
+        "hoist": False,
+        "managed": False,
+        "mentionable": False,
+    }
+
+
+def make_text_channel(channel_id: int, guild_id: int, name: str) -> dict[str, Any]:
+    return {
+        "id": str(channel_id),
+        "type": 0,
+        "guild_id": str(guild_id),
+        "name": name,
+        "position": 0,
+        "permission_overwrites": [],
+        "nsfw": False,
+        "parent_id": None,
+        "rate_limit_per_user": 0,
+    }
+
+
+def make_thread(
+    thread_id: int,
+    guild_id: int,
+    parent_id: int,
+    *,
+    owner_id: int,
+    name: str,
+    archived: bool = False,
+    locked: bool = False,
+) -> dict[str, Any]:
+    return {
+        "id": str(thread_id),
+        "type": 12,
+        "guild_id": str(guild_id),
+        "parent_id": str(parent_id),
+        "owner_id": str(owner_id),
+        "name": name,
+        "last_message_id": None,
+        "rate_limit_per_user": 0,
+        "message_count": 0,
+        "member_count": 0,
+        "thread_metadata": {
+            "archived": archived,
+            "auto_archive_duration": 10080,
+            "archive_timestamp": TIMESTAMP,
+            "locked": locked,
+            "invitable": False,
+        },
+    }
+
+
+def make_message(
+    message_id: int,
+    channel_id: int,
+    author: dict[str, Any],
+    *,
+    content: str = "",
+    guild_id: int | None = None,
+) -> dict[str, Any]:
+    message = {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": author,
+        "content": content,
+        "timestamp": TIMESTAMP,
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "components": [],
+    }
+    if guild_id is not None:
+        message["guild_id"] = str(guild_id)
+    return message
+
+
+def make_interaction(
+    interaction_id: int,
+    application_id: int,
+    *,
+    type: int,
+    guild_id: int,
+    channel: dict[str, Any],
+    member: dict[str, Any],
+    data: dict[str, Any],
+    message: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    interaction = {
+        "id": str(interaction_id),
+        "application_id": str(application_id),
+        "type": type,
+        "token": f"token-{interaction_id}",
+        "version": 1,
+        "guild_id": str(guild_id),
+        "channel_id": channel["id"],
+        "channel": channel,
+        "member": {**member, "permissions": ADMINISTRATOR},
+        "data": data,
+        "locale": "en-US",
+        "guild_locale": "en-US",
+        "app_permissions": ADMINISTRATOR,
+        "entitlements": [],
+        "authorizing_integration_owners": {},
+        "context": 0,
+        "attachment_size_limit": 10 * 1024 * 1024,
+    }
+    if message is not None:
+        interaction["message"] = message
+    return interaction
+
+
+# Guilds
+
+
+class FakeTicket(NamedTuple):
+    thread: dict[str, Any]
+    owner: dict[str, Any]
+
+
+class FakeGuild(NamedTuple):
+    id: int
+    channel: dict[str, Any]
+    inbox: dict[str, Any]
+    members: list[dict[str, Any]]
+    tickets: list[FakeTicket]
+
+
+async def create_guilds(
+    fake: FakeDiscord,
+    *,
+    guilds: int,
+    members_per_guild: int,
+    tickets_per_guild: int = 0,
+) -> list[FakeGuild]:
+    """Create guilds with an inbox and optionally existing tickets,
+    adding them to both the bot's cache and its database.
+    """
+    bot = fake.bot
+    bot_member = make_member(fake.bot_user)
+    fake_guilds: list[FakeGuild] = []
+
+    async with bot.acquire() as conn:
+        query = DatabaseClient(conn)
+
+        for i in range(guilds):
+            guild_id = fake.next_id()
+            channel = make_text_channel(fake.next_id(), guild_id, "inbox")
+            inbox = make_message(
+                fake.next_id(),
+                int(channel["id"]),
+                fake.bot_user,
+                guild_id=guild_id,
+            )
+            members = [
+                make_member(make_user(fake.next_id(), f"user-{i}-{j}"))
+                for j in range(members_per_guild)
+            ]
+            tickets = [
+                FakeTicket(
+                    make_thread(
+                        fake.next_id(),
+                        guild_id,
+                        int(channel["id"]),
+                        owner_id=fake.application_id,
+                        name=f"ticket-{j}",
+                    ),
+                    owner,
+                )
+                for j, owner in zip(range(tickets_per_guild), itertools.cycle(members))
+            ]
+
+            payload: dict[str, Any] = {
+                "id": str(guild_id),
+                "name": f"guild-{i}",
+                "icon": None,
+                "owner_id": fake.bot_user["id"],
+                "roles": [make_role(guild_id, "@everyone", ADMINISTRATOR)],
+                "emojis": [],
+                "stickers": [],
+                "features": [],
+                "channels": [channel],
+                "threads": [ticket.thread for ticket in tickets],
+                "members": [bot_member, *members],
+                "member_count": len(members) + 1,
+                "large": False,
+                "preferred_locale": "en-US",
+                "unavailable": False,
+                "verification_level": 0,
+                "explicit_content_filter": 0,
+                "default_message_notifications": 0,
+                "mfa_level": 0,
+                "premium_tier": 0,
+                "nsfw_level": 0,
+                "system_channel_flags": 0,
+                "voice_states": [],
+                "presences": [],
+            }
+            fake.bot._connection._add_guild_from_data(cast("GuildPayload", payload))
+
+            await query.add_inbox(
+                int(inbox["id"]),
+                int(channel["id"]),
+                guild_id=guild_id,
+            )
+            for ticket in tickets:
+                await query.add_ticket(
+                    ticket_id=int(ticket.thread["id"]),
+                    inbox_id=int(inbox["id"]),
+                    owner_id=int(ticket.owner["user"]["id"]),
+                    guild_id=guild_id,
+                )
+
+            for ticket in tickets:
+                fake.threads[int(ticket.thread["id"])] = ticket.thread
+            fake_guilds.append(FakeGuild(guild_id, channel, inbox, members, tickets))
+
+        await conn.commit()
+
+    return fake_guilds
+
+
+# Bot
+
+
+@contextlib.asynccontextmanager
+async def run_bot(
+    fake: FakeDiscord,
+    *,
+    directory: Path | None = None,
+) -> AsyncIterator[Bot]:
+    """Start the bot with a fresh database against the given fake API.
+
+    :param directory:
+        The directory to store the config and database in.
+        If None, a temporary directory is used.
+
+    """
+    with contextlib.ExitStack() as stack:
+        if directory is None:
+            directory = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+
+        config_path = directory / "config.toml"
+        config_path.write_text(
+            "[bot]\n"
+            'token = "fake"\n'
+            "[bot.config_reload]\n"
+            "watch = false\n"
+            "[db]\n"
+            f"path = {str(directory / 'theticketbot.db')!r}\n"
+            "[tracing]\n"
+            "buffer_size = 1000000\n"
+        )
+
+        bot = Bot(
+            lambda: load_config(config_path),
+            config_path=config_path,
+            startup_flags=StartupFlags.SKIP_AUTO_SYNC,
+        )
+        fake.attach(bot)
+
+        await bot.login("fake")
+        try:
+            yield bot
+        finally:
+            await bot.close()
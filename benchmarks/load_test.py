@@ -0,0 +1,424 @@
+"""Run theticketbot's cogs under load against a simulated Discord API.
+
+Usage::
+
+    python benchmarks/load_test.py [SCENARIO] [-n EVENTS] [--duration SECONDS]
+        [--guilds N] [--members-per-guild N] [--latency SECONDS]
+        [--ratelimit-chance P]
+
+Events are dispatched through discord.py's own gateway parsers with
+exponentially distributed arrival times, so the real views, listeners,
+and command tree handle them. Latency is measured from when each event
+was dispatched until the task handling it finished.
+
+Scenarios:
+
+- ``clicks``: Users click the create ticket button on inboxes.
+- ``listeners``: Ticket owners leave tickets and guilds,
+  and tickets are archived.
+- ``cleanup``: Messages, threads, and channels are deleted.
+- ``select``: Users select messages for pending message commands.
+
+"""
+
+import argparse
+import asyncio
+import collections
+import logging
+import random
+import re
+import sys
+import time
+from typing import Any, Callable
+
+import discord
+from fake_discord import (
+    FakeDiscord,
+    FakeGuild,
+    HTTPProfile,
+    create_guilds,
+    make_interaction,
+    make_message,
+    run_bot,
+)
+from stats import format_milliseconds, summarize
+
+from theticketbot.bot import Bot
+from theticketbot.tracing import TRACER
+
+log = logging.getLogger(__name__)
+
+_TASK_ID_PATTERN = re.compile(r"[-:]?[0-9a-f]{8,}$|-\d+$")
+
+Dispatch = Callable[[], None]
+Scenario = Callable[[FakeDiscord, list[FakeGuild], random.Random], Dispatch]
+
+
+class TaskRecorder:
+    """Measures how long each task created by discord.py takes to finish.
+
+    Tasks are grouped by their name, with any trailing IDs removed.
+
+    """
+
+    def __init__(self) -> None:
+        self.latencies: collections.defaultdict[str, list[float]] = (
+            collections.defaultdict(list)
+        )
+        self.pending: set[asyncio.Task] = set()
+        self.enabled = False
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        loop.set_task_factory(self._create_task)
+
+    def _create_task(self, loop: asyncio.AbstractEventLoop, coro, **kwargs: Any):
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+        if self.enabled:
+            self.pending.add(task)
+            task.add_done_callback(
+                lambda task, start=time.perf_counter(): self._on_done(task, start)
+            )
+        return task
+
+    def _on_done(self, task: asyncio.Task, start: float) -> None:
+        self.pending.discard(task)
+        name = get_task_name(task)
+        if name.startswith(("discord", "CommandTree")):
+            self.latencies[name].append(time.perf_counter() - start)
+
+
+def get_task_name(task: asyncio.Task) -> str:
+    """Return the name of a task without any trailing IDs."""
+    return _TASK_ID_PATTERN.sub("", task.get_name())
+
+
+class ErrorCounter(logging.Handler):
+    """Counts errors logged by the bot by their exception type."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.ERROR)
+        self.errors: collections.Counter[str] = collections.Counter()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.exc_info is not None and record.exc_info[0] is not None:
+            self.errors[record.exc_info[0].__name__] += 1
+        else:
+            self.errors[record.getMessage()[:60]] += 1
+
+
+# Scenarios
+
+
+def click_inboxes(
+    fake: FakeDiscord,
+    guilds: list[FakeGuild],
+    rng: random.Random,
+) -> Dispatch:
+    def dispatch() -> None:
+        guild = rng.choice(guilds)
+        data = make_interaction(
+            fake.next_id(),
+            fake.application_id,
+            type=3,
+            guild_id=guild.id,
+            channel=guild.channel,
+            member=rng.choice(guild.members),
+            message=guild.inbox,
+            data={"custom_id": "create-ticket", "component_type": 2},
+        )
+        fake.dispatch("INTERACTION_CREATE", data)
+
+    return dispatch
+
+
+def remove_owners(
+    fake: FakeDiscord,
+    guilds: list[FakeGuild],
+    rng: random.Random,
+) -> Dispatch:
+    def leave_ticket(guild: FakeGuild) -> None:
+        ticket = rng.choice(guild.tickets)
+        data = {
+            "id": ticket.thread["id"],
+            "guild_id": str(guild.id),
+            "member_count": 0,
+            "removed_member_ids": [ticket.owner["user"]["id"]],
+        }
+        fake.dispatch("THREAD_MEMBERS_UPDATE", data)
+
+    def leave_guild(guild: FakeGuild) -> None:
+        member = rng.choice(guild.members)
+        data = {"guild_id": str(guild.id), "user": member["user"]}
+        fake.dispatch("GUILD_MEMBER_REMOVE", data)
+
+    def archive_ticket(guild: FakeGuild) -> None:
+        ticket = rng.choice(guild.tickets)
+        data = dict(ticket.thread)
+        data["thread_metadata"] = {**data["thread_metadata"], "archived": True}
+        fake.dispatch("THREAD_UPDATE", data)
+
+    events = (leave_ticket, leave_guild, archive_ticket)
+
+    def dispatch() -> None:
+        rng.choice(events)(rng.choice(guilds))
+
+    return dispatch
+
+
+def delete_objects(
+    fake: FakeDiscord,
+    guilds: list[FakeGuild],
+    rng: random.Random,
+) -> Dispatch:
+    def delete_message(guild: FakeGuild) -> None:
+        data = {
+            "id": str(fake.next_id()),
+            "channel_id": guild.channel["id"],
+            "guild_id": str(guild.id),
+        }
+        fake.dispatch("MESSAGE_DELETE", data)
+
+    def bulk_delete_messages(guild: FakeGuild) -> None:
+        data = {
+            "ids": [str(fake.next_id()) for _ in range(rng.randint(2, 100))],
+            "channel_id": guild.channel["id"],
+            "guild_id": str(guild.id),
+        }
+        fake.dispatch("MESSAGE_DELETE_BULK", data)
+
+    def delete_thread(guild: FakeGuild) -> None:
+        thread = rng.choice(guild.tickets).thread
+        data = {
+            "id": thread["id"],
+            "guild_id": str(guild.id),
+            "parent_id": thread["parent_id"],
+            "type": thread["type"],
+        }
+        fake.dispatch("THREAD_DELETE", data)
+
+    # Most deleted messages are unrelated to the bot
+    events = (delete_message,) * 8 + (bulk_delete_messages, delete_thread)
+
+    def dispatch() -> None:
+        rng.choice(events)(rng.choice(guilds))
+
+    return dispatch
+
+
+def select_messages(
+    fake: FakeDiscord,
+    guilds: list[FakeGuild],
+    rng: random.Random,
+) -> Dispatch:
+    select = fake.bot.get_cog("Select")
+    assert select is not None
+    (menu,) = select.cog_menus  # type: ignore
+
+    async def callback(
+        interaction: discord.Interaction,
+        message: discord.Message,
+    ) -> None:
+        await interaction.response.send_message("Selected!", ephemeral=True)
+
+    def dispatch() -> None:
+        guild = rng.choice(guilds)
+        member = rng.choice(guild.members)
+        user_id = int(member["user"]["id"])
+        select.set_message_callback(guild.id, user_id, callback)  # type: ignore
+
+        message = make_message(
+            fake.next_id(),
+            int(guild.channel["id"]),
+            member["user"],
+            guild_id=guild.id,
+        )
+        data = make_interaction(
+            fake.next_id(),
+            fake.application_id,
+            type=2,
+            guild_id=guild.id,
+            channel=guild.channel,
+            member=member,
+            data={
+                "id": str(fake.next_id()),
+                "name": menu.name,
+                "type": 3,
+                "target_id": message["id"],
+                "resolved": {"messages": {message["id"]: message}},
+            },
+        )
+        fake.dispatch("INTERACTION_CREATE", data)
+
+    return dispatch
+
+
+SCENARIOS: dict[str, Scenario] = {
+    "clicks": click_inboxes,
+    "listeners": remove_owners,
+    "cleanup": delete_objects,
+    "select": select_messages,
+}
+
+
+# Runner
+
+
+async def run(args: argparse.Namespace) -> None:
+    recorder = TaskRecorder()
+    recorder.install(asyncio.get_running_loop())
+
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    profile = HTTPProfile(
+        latency=args.latency,
+        jitter=args.jitter,
+        ratelimit_chance=args.ratelimit_chance,
+        retry_after=args.retry_after,
+    )
+    fake = FakeDiscord(profile, seed=args.seed)
+    rng = random.Random(args.seed)
+
+    async with run_bot(fake) as bot:
+        print(f"Creating {args.guilds} guilds...")
+        guilds = await create_guilds(
+            fake,
+            guilds=args.guilds,
+            members_per_guild=args.members_per_guild,
+            tickets_per_guild=args.tickets_per_guild,
+        )
+
+        dispatch = SCENARIOS[args.scenario](fake, guilds, rng)
+        fake.stats.clear()
+        TRACER.traces.clear()
+        recorder.enabled = True
+
+        print(
+            f"Dispatching {args.events} {args.scenario} events "
+            f"over {args.duration:g}s..."
+        )
+        start = time.perf_counter()
+        await dispatch_events(dispatch, args.events, args.duration, rng)
+        dispatched = time.perf_counter() - start
+
+        if len(recorder.pending) > 0:
+            await asyncio.wait(recorder.pending, timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        recorder.enabled = False
+
+        print_report(bot, fake, recorder, errors.errors, dispatched, elapsed)
+
+
+async def dispatch_events(
+    dispatch: Dispatch,
+    events: int,
+    duration: float,
+    rng: random.Random,
+) -> None:
+    rate = events / duration
+    start = time.perf_counter()
+    offset = 0.0
+    for _ in range(events):
+        offset += rng.expovariate(rate)
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        dispatch()
+
+
+def print_report(
+    bot: Bot,
+    fake: FakeDiscord,
+    recorder: TaskRecorder,
+    errors: collections.Counter[str],
+    dispatched: float,
+    elapsed: float,
+) -> None:
+    completed = sum(map(len, recorder.latencies.values()))
+    print(
+        f"\nDispatched in {dispatched:.2f}s, completed in {elapsed:.2f}s "
+        f"({completed / elapsed:,.1f} tasks/s, "
+        f"{len(recorder.pending)} unfinished, {errors.total()} errors)"
+    )
+    if len(errors) > 0:
+        print("Errors: " + ", ".join(f"{k}={v}" for k, v in errors.most_common()))
+
+    print(f"\n{'Task':<44} {'Count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for name, latencies in sorted(recorder.latencies.items()):
+        print_summary_row(name, latencies)
+
+    spans: collections.defaultdict[str, list[float]] = collections.defaultdict(list)
+    results: collections.Counter[str] = collections.Counter()
+    for trace in TRACER.traces:
+        results[str(trace.attributes.get("result"))] += 1
+        for _, span in trace.walk():
+            if span.duration is not None:
+                spans[span.name].append(span.duration)
+
+    if len(spans) > 0:
+        print(
+            f"\n{'Span':<44} {'Count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"
+        )
+        for name, durations in sorted(spans.items()):
+            print_summary_row(name, durations)
+
+        print("\nResults: " + ", ".join(f"{k}={v}" for k, v in results.items()))
+
+    print(f"\n{'HTTP route':<60} {'Requests':>8} {'429s':>6} {'p50':>9} {'p99':>9}")
+    for route, stats in sorted(fake.stats.items()):
+        summary = summarize(stats.latencies)
+        print(
+            f"{route:<60} {stats.requests:>8} {stats.ratelimited:>6} "
+            f"{format_milliseconds(summary['p50']):>9} "
+            f"{format_milliseconds(summary['p99']):>9}"
+        )
+
+
+def print_summary_row(name: str, values: list[float]) -> None:
+    print(format_summary_row(name, values))
+
+
+def format_summary_row(name: str, values: list[float]) -> str:
+    summary = summarize(values)
+    return f"{name:<44} {len(values):>7} " + " ".join(
+        f"{format_milliseconds(summary[key]):>9}"
+        for key in ("p50", "p90", "p99", "max")
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("scenario", choices=SCENARIOS, default="clicks", nargs="?")
+    parser.add_argument("-n", "--events", default=10_000, type=int)
+    parser.add_argument("--duration", default=60.0, type=float)
+    parser.add_argument("--guilds", default=500, type=int)
+    parser.add_argument("--members-per-guild", default=50, type=int)
+    parser.add_argument("--tickets-per-guild", default=10, type=int)
+    parser.add_argument("--latency", default=0.05, type=float)
+    parser.add_argument("--jitter", default=0.02, type=float)
+    parser.add_argument("--ratelimit-chance", default=0.0, type=float)
+    parser.add_argument("--retry-after", default=1.0, type=float)
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument(
+        "--timeout",
+        default=60.0,
+        type=float,
+        help="The number of seconds to wait for unfinished tasks",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(
+            format="%(levelname)s:%(name)s:%(message)s",
+            level=logging.INFO,
+        )
+    else:
+        # Errors are still counted and summarized in the report
+        logging.getLogger().setLevel(logging.ERROR)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
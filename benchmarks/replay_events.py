@@ -0,0 +1,448 @@
+"""Replay recorded gateway events through theticketbot's cogs.
+
+Usage::
+
+    python benchmarks/replay_events.py EVENTS [EVENTS ...] [--speed N]
+        [--limit N] [--latency SECONDS] [--output FILE]
+
+Events are recorded by setting ``file`` in the ``[event_recorder]``
+config table. Since the recording only contains anonymized IDs, the
+guilds, channels, and threads it references are added to the bot's
+cache before replaying, and every thread owned by the bot is added to
+the database as a ticket. Threads whose owner wasn't recorded are
+assumed to be tickets.
+
+Events are dispatched through discord.py's gateway parsers at their
+original pace multiplied by ``--speed``, or as fast as possible with
+``--speed 0``. The report shows how long each event took to parse, how
+long each listener took to finish, and how many database rows each
+listener changed.
+
+"""
+
+import argparse
+import asyncio
+import collections
+import contextlib
+import datetime
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, NamedTuple, cast
+
+from fake_discord import (
+    ADMINISTRATOR,
+    FakeDiscord,
+    HTTPProfile,
+    make_member,
+    make_message,
+    make_role,
+    make_text_channel,
+    make_thread,
+    run_bot,
+)
+from load_test import (
+    ErrorCounter,
+    TaskRecorder,
+    format_summary_row,
+    get_task_name,
+    print_summary_row,
+)
+from stats import summarize
+
+from theticketbot.bot import Bot
+from theticketbot.database import DatabaseClient
+from theticketbot.event_recorder import SELF_ID
+
+if TYPE_CHECKING:
+    from discord.types.guild import Guild as GuildPayload
+
+
+class RecordedEvent(NamedTuple):
+    time: float
+    name: str
+    data: Any
+
+
+def load_events(paths: Iterable[Path], self_id: str) -> list[RecordedEvent]:
+    """Load events from one or more recordings, sorted by time.
+
+    :param paths: The JSONL files to load.
+    :param self_id: The ID to replace the bot's anonymized ID with.
+
+    """
+    events = []
+    for path in paths:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                events.append(
+                    RecordedEvent(
+                        event["t"],
+                        event["event"],
+                        _replace_self_id(event["data"], self_id),
+                    )
+                )
+
+    events.sort(key=lambda event: event.time)
+    return events
+
+
+def _replace_self_id(data: Any, self_id: str) -> Any:
+    if isinstance(data, dict):
+        return {k: _replace_self_id(v, self_id) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [_replace_self_id(v, self_id) for v in data]
+    elif data == SELF_ID:
+        return self_id
+    return data
+
+
+class ChangeCounter:
+    """Counts the database rows changed by each task acquiring a connection."""
+
+    def __init__(self) -> None:
+        self.changes: collections.Counter[str] = collections.Counter()
+        self.enabled = False
+
+    def install(self, bot: Bot) -> None:
+        acquire = bot.acquire
+
+        @contextlib.asynccontextmanager
+        async def counting_acquire(**kwargs: Any) -> AsyncIterator[Any]:
+            async with acquire(**kwargs) as conn:
+                try:
+                    yield conn
+                finally:
+                    if self.enabled:
+                        self._record(conn.get_connection().total_changes)
+
+        bot.acquire = counting_acquire  # type: ignore
+
+    def _record(self, changes: int) -> None:
+        task = asyncio.current_task()
+        name = "?" if task is None else get_task_name(task)
+        self.changes[name] += changes
+
+
+async def seed_state(fake: FakeDiscord, events: list[RecordedEvent]) -> int:
+    """Add the guilds, channels, and threads referenced by events
+    to the bot's cache, and the bot's threads to the database as tickets.
+
+    Threads created during the recording are left to be created by
+    their THREAD_CREATE events, but are still added as tickets.
+
+    :returns: The number of tickets added.
+
+    """
+    bot = fake.bot
+    self_id = str(fake.application_id)
+
+    guild_ids: set[str] = set()
+    channels: dict[str, dict[str, Any]] = {}
+    threads: dict[str, dict[str, Any]] = {}
+    created_threads: set[str] = set()
+    owners: dict[str, str] = {}
+
+    for event in events:
+        data = event.data
+        guild_id = data.get("guild_id")
+        if guild_id is None:
+            continue
+        guild_ids.add(guild_id)
+
+        if event.name == "CHANNEL_DELETE":
+            channels.setdefault(data["id"], data)
+        elif event.name in ("THREAD_CREATE", "THREAD_UPDATE"):
+            if event.name == "THREAD_CREATE" and data["id"] not in threads:
+                created_threads.add(data["id"])
+            threads.setdefault(data["id"], data)
+        elif event.name in ("THREAD_DELETE", "THREAD_MEMBERS_UPDATE"):
+            # Only full thread payloads include the owner, so partial
+            # threads are assumed to be tickets
+            threads.setdefault(
+                data["id"],
+                {
+                    "id": data["id"],
+                    "guild_id": guild_id,
+                    "parent_id": data.get("parent_id"),
+                },
+            )
+            for user_id in data.get("removed_member_ids", ()):
+                owners.setdefault(data["id"], user_id)
+
+    # Threads whose parents weren't recorded are put in a channel per guild
+    default_channels = {
+        guild_id: make_text_channel(fake.next_id(), int(guild_id), "inbox")
+        for guild_id in guild_ids
+    }
+    guild_channels: collections.defaultdict[str, dict[str, dict[str, Any]]] = (
+        collections.defaultdict(dict)
+    )
+    for guild_id, channel in default_channels.items():
+        guild_channels[guild_id][channel["id"]] = channel
+    for channel in channels.values():
+        guild_channels[channel["guild_id"]][channel["id"]] = channel
+
+    guild_threads: collections.defaultdict[str, list[dict[str, Any]]] = (
+        collections.defaultdict(list)
+    )
+    for thread_id, thread in list(threads.items()):
+        guild_id = thread["guild_id"]
+        if "thread_metadata" not in thread:
+            parent_id = thread["parent_id"] or default_channels[guild_id]["id"]
+            thread = threads[thread_id] = make_thread(
+                int(thread_id),
+                int(guild_id),
+                int(parent_id),
+                owner_id=fake.application_id,
+                name="ticket",
+            )
+
+        parent_id = thread["parent_id"]
+        if parent_id not in guild_channels[guild_id]:
+            channel = make_text_channel(int(parent_id), int(guild_id), "channel")
+            guild_channels[guild_id][parent_id] = channel
+        if thread_id not in created_threads:
+            guild_threads[guild_id].append(thread)
+            fake.threads[int(thread_id)] = thread
+
+    bot_member = make_member(fake.bot_user)
+    for guild_id in guild_ids:
+        payload: dict[str, Any] = {
+            "id": guild_id,
+            "name": "guild",
+            "icon": None,
+            "owner_id": self_id,
+            "roles": [make_role(int(guild_id), "@everyone", ADMINISTRATOR)],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "channels": list(guild_channels[guild_id].values()),
+            "threads": guild_threads[guild_id],
+            "members": [bot_member],
+            "member_count": 1,
+            "large": False,
+            "preferred_locale": "en-US",
+            "unavailable": False,
+            "verification_level": 0,
+            "explicit_content_filter": 0,
+            "default_message_notifications": 0,
+            "mfa_level": 0,
+            "premium_tier": 0,
+            "nsfw_level": 0,
+            "system_channel_flags": 0,
+            "voice_states": [],
+            "presences": [],
+        }
+        bot._connection._add_guild_from_data(cast("GuildPayload", payload))
+
+    tickets = 0
+    async with bot.acquire() as conn:
+        query = DatabaseClient(conn)
+
+        inboxes: dict[str, int] = {}
+        for guild_id, channel in default_channels.items():
+            inbox = make_message(
+                fake.next_id(),
+                int(channel["id"]),
+                fake.bot_user,
+                guild_id=int(guild_id),
+            )
+            inboxes[guild_id] = int(inbox["id"])
+            await query.add_inbox(
+                int(inbox["id"]),
+                int(channel["id"]),
+                guild_id=int(guild_id),
+            )
+
+        for thread_id, thread in threads.items():
+            if thread.get("owner_id") != self_id:
+                continue
+
+            owner_id = owners.get(thread_id) or str(fake.next_id())
+            await query.add_ticket(
+                ticket_id=int(thread_id),
+                inbox_id=inboxes[thread["guild_id"]],
+                owner_id=int(owner_id),
+                guild_id=int(thread["guild_id"]),
+            )
+            tickets += 1
+
+    return tickets
+
+
+async def replay_events(
+    fake: FakeDiscord,
+    events: list[RecordedEvent],
+    *,
+    speed: float,
+) -> tuple[dict[str, list[float]], float]:
+    """Dispatch events at their recorded pace multiplied by the given speed.
+
+    :returns:
+        The time taken to parse each event by name,
+        and the furthest the replay fell behind schedule in seconds.
+
+    """
+    parse_times: collections.defaultdict[str, list[float]] = collections.defaultdict(
+        list
+    )
+    max_lag = 0.0
+    if len(events) == 0:
+        return parse_times, max_lag
+
+    first = events[0].time
+    start = time.perf_counter()
+    for i, event in enumerate(events):
+        if speed > 0:
+            scheduled = start + (event.time - first) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+        elif i % 100 == 0:
+            # Let listeners run so they aren't all scheduled at once
+            await asyncio.sleep(0)
+
+        parse_start = time.perf_counter()
+        fake.dispatch(event.name, event.data)
+        parse_times[event.name].append(time.perf_counter() - parse_start)
+
+    return parse_times, max_lag
+
+
+async def run(args: argparse.Namespace) -> None:
+    recorder = TaskRecorder()
+    recorder.install(asyncio.get_running_loop())
+
+    errors = ErrorCounter()
+    logging.getLogger().addHandler(errors)
+
+    profile = HTTPProfile(latency=args.latency, jitter=args.jitter)
+    fake = FakeDiscord(profile, seed=args.seed)
+
+    events = load_events(args.events, str(fake.application_id))
+    if args.limit is not None:
+        events = events[: args.limit]
+    if len(events) == 0:
+        sys.exit("No events to replay")
+
+    recorded = events[-1].time - events[0].time
+    print(f"Loaded {len(events):,} events recorded over {recorded:,.1f}s")
+
+    async with run_bot(fake) as bot:
+        changes = ChangeCounter()
+        changes.install(bot)
+
+        tickets = await seed_state(fake, events)
+        print(f"Added {len(bot.guilds):,} guilds and {tickets:,} tickets")
+
+        fake.stats.clear()
+        recorder.enabled = True
+        changes.enabled = True
+
+        speed = "as fast as possible" if args.speed == 0 else f"at {args.speed:g}x"
+        print(f"Replaying {speed}...")
+        start = time.perf_counter()
+        parse_times, max_lag = await replay_events(fake, events, speed=args.speed)
+        dispatched = time.perf_counter() - start
+
+        if len(recorder.pending) > 0:
+            await asyncio.wait(recorder.pending, timeout=args.timeout)
+        elapsed = time.perf_counter() - start
+        recorder.enabled = False
+        changes.enabled = False
+
+    print(
+        f"\nDispatched in {dispatched:.2f}s ({len(events) / dispatched:,.1f} events/s, "
+        f"{max_lag:.3f}s max lag), completed in {elapsed:.2f}s "
+        f"({len(recorder.pending)} unfinished, {errors.errors.total()} errors)"
+    )
+    if len(errors.errors) > 0:
+        print(
+            "Errors: " + ", ".join(f"{k}={v}" for k, v in errors.errors.most_common())
+        )
+
+    header = f"{'Count':>7} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"
+    print(f"\n{'Event parsing':<44} {header}")
+    for name, durations in sorted(parse_times.items()):
+        print_summary_row(name, durations)
+
+    print(f"\n{'Listener':<44} {header} {'Rows':>7}")
+    for name, latencies in sorted(recorder.latencies.items()):
+        print(f"{format_summary_row(name, latencies)} {changes.changes[name]:>7}")
+
+    print(f"\nDatabase rows changed: {changes.changes.total():,}")
+    print(f"HTTP requests: {sum(stats.requests for stats in fake.stats.values()):,}")
+
+    if args.output is not None:
+        report = {
+            "created": datetime.datetime.now().astimezone().isoformat(),
+            "events": len(events),
+            "speed": args.speed,
+            "dispatched": dispatched,
+            "elapsed": elapsed,
+            "max_lag": max_lag,
+            "errors": dict(errors.errors),
+            "parsing": {
+                name: summarize(durations) for name, durations in parse_times.items()
+            },
+            "listeners": {
+                name: {**summarize(latencies), "rows": changes.changes[name]}
+                for name, latencies in recorder.latencies.items()
+            },
+            "http": {
+                route: {"requests": stats.requests, **summarize(stats.latencies)}
+                for route, stats in fake.stats.items()
+            },
+        }
+        with args.output.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"Report written to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=(__doc__ or "").partition("\n")[0])
+    parser.add_argument("events", nargs="+", type=Path)
+    parser.add_argument(
+        "--speed",
+        default=1.0,
+        type=float,
+        help="How much faster than recorded to replay, or 0 for as fast as possible",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        help="Only replay the first N events",
+    )
+    parser.add_argument("--latency", default=0.05, type=float)
+    parser.add_argument("--jitter", default=0.02, type=float)
+    parser.add_argument("--output", type=Path, help="Write a JSON report here")
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument(
+        "--timeout",
+        default=60.0,
+        type=float,
+        help="The number of seconds to wait for unfinished tasks",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    if args.verbose:
+        logging.basicConfig(
+            format="%(levelname)s:%(name)s:%(message)s",
+            level=logging.INFO,
+        )
+    else:
+        # Errors are still counted and summarized in the report
+        logging.getLogger().setLevel(logging.ERROR)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
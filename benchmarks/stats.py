@@ -0,0 +1,35 @@
+"""Helpers for summarizing benchmark measurements."""
+
+import math
+from typing import Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Return the q-th percentile of some sorted values
+    using the nearest-rank method.
+    """
+    if len(sorted_values) == 0:
+        return math.nan
+
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[max(rank - 1, 0)]
+
+
+def summarize(values: Sequence[float]) -> dict[str, float]:
+    """Return the count, mean, and common percentiles of some values."""
+    sorted_values = sorted(values)
+    count = len(sorted_values)
+    return {
+        "count": count,
+        "mean": sum(sorted_values) / count if count > 0 else math.nan,
+        "p50": percentile(sorted_values, 50),
+        "p90": percentile(sorted_values, 90),
+        "p99": percentile(sorted_values, 99),
+        "max": sorted_values[-1] if count > 0 else math.nan,
+    }
+
+
+def format_milliseconds(seconds: float) -> str:
+    if math.isnan(seconds):
+        return "-"
+    return f"{seconds * 1000:.1f}ms"
@@ -1,5 +1,6 @@
+from __future__ import annotations
+
 import argparse
-import asyncio
 import functools
 import getpass
 import importlib.metadata
@@ -7,20 +8,25 @@ import logging
 import os
 import re
 import sys
+import time
 from pathlib import Path
-from typing import Type
-
-from pydantic import SecretStr
+from typing import TYPE_CHECKING, Type
 
 from . import __version__
-from .appdirs import APP_DIRS
-from .bot import Bot, StartupFlags
-from .config import load_config
-from .logging import configure_logging
+from .profiling import StartupProfiler
+
+if TYPE_CHECKING:
+    from .bot import Bot, StartupFlags
+    from .migrations import MigrationTiming
 
 log = logging.getLogger(__package__)
 
-USER_CONFIG = APP_DIRS.user_config_path / "config.toml"
+
+@functools.cache
+def get_user_config() -> Path:
+    from .appdirs import APP_DIRS
+
+    return APP_DIRS.user_config_path / "config.toml"
 
 
 def suppress(*exceptions: Type[BaseException]):
@@ -39,6 +45,7 @@ def suppress(*exceptions: Type[BaseException]):
 
 @suppress(KeyboardInterrupt)
 def main() -> None:
+    profiler = StartupProfiler()
     parser = argparse.ArgumentParser(
         prog=__package__,
         description=importlib.metadata.metadata("theticketbot")["Summary"],
@@ -61,21 +68,25 @@ def main() -> None:
         help="The config file to load",
         type=Path,
     )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Write a report of startup and import times to the log directory",
+    )
     commands = parser.add_mutually_exclusive_group()
     commands.add_argument(
         "--sync",
         action="store_const",
-        const=StartupFlags.SYNC | StartupFlags.CLOSE,
-        default=StartupFlags(0),
-        dest="startup_flags",
+        const="sync",
+        dest="sync_mode",
         help="Sync application commands at startup",
     )
     commands.add_argument(
         "--no-sync",
         action="store_const",
-        const=StartupFlags.SKIP_AUTO_SYNC,
-        dest="startup_flags",
-        help="Skip automatic syncing for the current version",
+        const="no-sync",
+        dest="sync_mode",
+        help="Skip automatic syncing for the current application commands",
     )
     commands.add_argument(
         "--dump-config",
@@ -83,16 +94,98 @@ def main() -> None:
         help="Dump config file at startup",
     )
 
+    subparsers = parser.add_subparsers(dest="command", title="commands")
+    rehearse_parser = subparsers.add_parser(
+        "rehearse-migrations",
+        help="Time pending migrations against a copy of the database",
+        description=(
+            "Copy the database using SQLite's online backup API, "
+            "then run and time each pending migration on the copy. "
+            "The original database is never modified."
+        ),
+    )
+    rehearse_parser.add_argument(
+        "--output",
+        help="Keep the migrated copy at this path instead of a temporary file",
+        type=Path,
+    )
+
+    dataset_parser = subparsers.add_parser(
+        "generate-dataset",
+        help="Generate a database filled with synthetic data",
+        description=(
+            "Create a new database with synthetic guilds, inboxes, and tickets "
+            "for benchmarking and rehearsing migrations. Guild sizes, inbox "
+            "popularity, and tickets per member follow Zipf distributions."
+        ),
+    )
+    dataset_parser.add_argument(
+        "output",
+        help="The path of the database to create",
+        type=Path,
+    )
+    dataset_parser.add_argument("--guilds", default=100, type=int)
+    dataset_parser.add_argument(
+        "--members-per-guild",
+        default=500,
+        help="The mean number of members in each guild",
+        type=float,
+    )
+    dataset_parser.add_argument("--inboxes-per-guild", default=2, type=int)
+    dataset_parser.add_argument("--staff-per-inbox", default=2, type=int)
+    dataset_parser.add_argument(
+        "--tickets-per-owner",
+        default=2,
+        help="The mean number of tickets created by each member",
+        type=float,
+    )
+    dataset_parser.add_argument(
+        "--exponent",
+        default=1.1,
+        help="The exponent of the Zipf distributions, where higher is more skewed",
+        type=float,
+    )
+    dataset_parser.add_argument(
+        "--schema-version",
+        help="Generate an older version of the schema instead of the latest",
+        type=int,
+    )
+    dataset_parser.add_argument("--seed", type=int)
+
     args = parser.parse_args()
     config_file: Path | None = args.config_file
-    startup_flags: StartupFlags = args.startup_flags
-
-    # Configure logging early to capture our own initialization
-    configure_logging(args.verbose)
 
     if args.dump_config:
         dump_config_and_exit(config_file)
 
+    # Heavier modules are imported here so the above commands don't pay
+    # for importing discord.py and loading localizations
+    from .logging import configure_logging
+
+    # Configure logging early to capture our own initialization
+    with profiler.phase("logging"):
+        configure_logging(args.verbose)
+
+    if args.command == "rehearse-migrations":
+        rehearse_migrations_and_exit(config_file, args.output)
+    elif args.command == "generate-dataset":
+        generate_dataset_and_exit(args)
+
+    with profiler.phase("imports"):
+        from pydantic import SecretStr
+
+        from .bot import Bot, StartupFlags
+        from .config import load_config
+
+    startup_flags = StartupFlags(0)
+    if args.sync_mode == "sync":
+        startup_flags |= StartupFlags.SYNC | StartupFlags.CLOSE
+    elif args.sync_mode == "no-sync":
+        startup_flags |= StartupFlags.SKIP_AUTO_SYNC
+
+    if args.profile_startup:
+        startup_flags |= StartupFlags.PROFILE
+
     if config_file is None:
         config_file = find_config_file()
 
@@ -103,10 +196,13 @@ def main() -> None:
         if not startup_flags & StartupFlags.SKIP_AUTO_SYNC:
             startup_flags |= StartupFlags.SYNC
 
-    bot = Bot(
-        functools.partial(load_config, config_file),
-        startup_flags=startup_flags,
-    )
+    with profiler.phase("bot"):
+        bot = Bot(
+            functools.partial(load_config, config_file),
+            config_path=config_file,
+            startup_flags=startup_flags,
+            startup_profiler=profiler,
+        )
 
     check_outdated_database_path(bot.config.db.path, args.config_file)
 
@@ -123,11 +219,148 @@ def main() -> None:
         pragma = key_template.format(key)
         bot.key_pragma = SecretStr(pragma)
 
+    import asyncio
+
     log.info(f"Package version: {__version__}")
     asyncio.run(start(bot, temp_config_file))
 
 
 def dump_config_and_exit(config_file: Path | None) -> None:
+    from .config import load_config
+
+    config_file = find_config_file_or_exit(config_file)
+    config = load_config(config_file)
+    print(config_file)
+    print(config.model_dump_json(indent=4, exclude={"bot": {"token"}}))
+    sys.exit(1)
+
+
+def rehearse_migrations_and_exit(
+    config_file: Path | None,
+    output: Path | None,
+) -> None:
+    import contextlib
+    import sqlite3
+    import tempfile
+
+    from .config import load_config
+    from .migrations import MigrationFinder, MigrationRehearsal
+
+    config_file = find_config_file_or_exit(config_file)
+    config = load_config(config_file)
+    path = config.db.path
+    if not path.is_file():
+        sys.exit(f"No database exists at {path}")
+
+    pragmas = [p.get_secret_value() for p in config.db.pragmas]
+    key_template = config.db.key_template.get_secret_value()
+    if key_template != "":
+        key = getpass.getpass("Database Key: ")
+        pragmas.append(key_template.format(key))
+
+    def connect(path: Path) -> sqlite3.Connection:
+        conn = sqlite3.connect(path)
+        conn.executescript(";\n".join(pragmas))
+        return conn
+
+    with contextlib.ExitStack() as stack:
+        keep_output = output is not None
+        if output is None:
+            temp_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            output = Path(temp_dir) / path.name
+        elif output.exists():
+            sys.exit(f"Refusing to overwrite existing file {output}")
+
+        copy = stack.enter_context(contextlib.closing(connect(output)))
+        with contextlib.closing(connect(path)) as source:
+            start = time.perf_counter()
+            source.backup(copy)
+            log.info("Copied %s in %.3fs", path, time.perf_counter() - start)
+
+        rehearsal = MigrationRehearsal(copy)
+        version = rehearsal.get_version()
+        try:
+            timings = rehearsal.rehearse(MigrationFinder().discover())
+        except ValueError as e:
+            sys.exit(str(e))
+
+    print_migration_timings(version, timings)
+    if keep_output:
+        print(f"Migrated copy written to {output}")
+    sys.exit(0)
+
+
+def generate_dataset_and_exit(args: argparse.Namespace) -> None:
+    import contextlib
+    import sqlite3
+
+    from .dataset import DatasetOptions, generate_dataset
+
+    output: Path = args.output
+    if output.exists():
+        sys.exit(f"Refusing to overwrite existing file {output}")
+    elif args.guilds < 1 or args.members_per_guild < 1:
+        sys.exit("There must be at least one guild with at least one member")
+
+    options = DatasetOptions(
+        guilds=args.guilds,
+        members_per_guild=args.members_per_guild,
+        inboxes_per_guild=args.inboxes_per_guild,
+        staff_per_inbox=args.staff_per_inbox,
+        tickets_per_owner=args.tickets_per_owner,
+        exponent=args.exponent,
+        schema_version=args.schema_version,
+        seed=args.seed,
+    )
+
+    try:
+        with contextlib.closing(sqlite3.connect(output)) as conn:
+            summary = generate_dataset(conn, options)
+    except ValueError as e:
+        output.unlink(missing_ok=True)
+        sys.exit(str(e))
+
+    print(
+        f"Generated {summary.guilds:,} guilds, {summary.users:,} users, "
+        f"{summary.inboxes:,} inboxes, {summary.staff:,} staff, and "
+        f"{summary.tickets:,} tickets in {summary.duration:.1f}s"
+    )
+    sys.exit(0)
+
+
+def print_migration_timings(version: int, timings: list[MigrationTiming]) -> None:
+    import humanize
+
+    def format_size(size: int) -> str:
+        sign = "-" if size < 0 else "+"
+        return sign + humanize.naturalsize(abs(size), binary=True)
+
+    print(f"Current database version: v{version}")
+    if len(timings) == 0:
+        return print("No pending migrations")
+
+    print(
+        f"{'Version':>7}  {'Kind':<8}  {'Duration':>9}  {'Lock time':>9}  "
+        f"{'Batches':>8}  Size"
+    )
+    for t in timings:
+        kind = "backfill" if t.backfill else "schema"
+        print(
+            f"{t.version:>7}  {kind:<8}  {t.duration:>8.3f}s  "
+            f"{t.lock_time:>8.3f}s  {t.batches:>8,}  {format_size(t.size_delta)}"
+        )
+
+    # Backfills only lock the database for one batch at a time
+    duration = sum(t.duration for t in timings)
+    lock_time = sum(t.lock_time for t in timings if not t.backfill)
+    size_delta = sum(t.size_delta for t in timings)
+    print(
+        f"Total: {duration:.3f}s, {lock_time:.3f}s locked at startup, "
+        f"{format_size(size_delta)}"
+    )
+
+
+def find_config_file_or_exit(config_file: Path | None) -> Path:
     if config_file is None:
         config_file = find_config_file()
     if config_file is None:
@@ -136,16 +369,13 @@ def dump_config_and_exit(config_file: Path | None) -> None:
             "Please run the bot normally to generate a configuration file,\n"
             "or write your own configuration file."
         )
-
-    config = load_config(config_file)
-    print(config_file)
-    print(config.model_dump_json(indent=4, exclude={"bot": {"token"}}))
-    sys.exit(1)
+    return config_file
 
 
 def find_config_file() -> Path | None:
+    user_config = get_user_config()
     cwd_config = Path("config.toml")
-    if USER_CONFIG.exists():
+    if user_config.exists():
         if cwd_config.exists():
             log.warning(
                 "\n"
@@ -154,17 +384,20 @@ def find_config_file() -> Path | None:
                 "If you want to load the config.toml from CWD instead,\n"
                 "add `--config-file config.toml` to your command-line arguments."
             )
-        return USER_CONFIG
+        return user_config
     elif cwd_config.exists():
         return cwd_config
 
 
 def prompt_and_create_config_file(startup_flags: StartupFlags) -> Path:
+    from .bot import StartupFlags
+
+    user_config = get_user_config()
     print(
         f"No config.toml file was found in the current working directory.\n"
         f"A minimal config file will be written to:\n"
         f"\n"
-        f"    {USER_CONFIG}"
+        f"    {user_config}"
     )
     if startup_flags & StartupFlags.SYNC:
         print(
@@ -177,12 +410,12 @@ def prompt_and_create_config_file(startup_flags: StartupFlags) -> Path:
 
     token = input_token()
 
-    USER_CONFIG.parent.mkdir(parents=True, exist_ok=True)
-    with USER_CONFIG.open("w") as f:
+    user_config.parent.mkdir(parents=True, exist_ok=True)
+    with user_config.open("w") as f:
         f.write("[bot]\n")
         f.write(f'token = "{token}"\n')
 
-    return USER_CONFIG
+    return user_config
 
 
 def input_token() -> str:
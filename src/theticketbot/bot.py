@@ -1,34 +1,63 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import importlib.metadata
+import importlib.util
 import logging
 import sqlite3
+import subprocess
 import sys
+import threading
+import time
 from enum import Flag, auto
-from typing import TYPE_CHECKING, AsyncGenerator, Callable, cast
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncGenerator, Callable, Self, cast
 
 import asqlite
 import discord
 from discord.ext import commands
 from pydantic import SecretStr
 
+from .appdirs import APP_DIRS
+from .config_watcher import ConfigWatcher
 from .database import DatabaseClient, connect as database_connect
-from .migrations import run_default_migrations
-from .translator import FluentTranslator
-from .versions import CURRENT_VERSION, sync_upgrade_or_downgrade
+from .event_recorder import RECORDER as EVENT_RECORDER, configure_event_recorder
+from . import metrics
+from .logging import configure_log_filters
+from .loop_monitor import LoopMonitor
+from .query_stats import RECORDER as QUERY_RECORDER
+from .tracing import configure_tracing
+from .migrations import run_default_backfills, run_default_migrations
+from .profiling import StartupProfiler, measure_import_times
+from .translator import FluentTranslator, fluent
+from .tree import CommandTree
 
 if TYPE_CHECKING:
     from .cogs.select import MessageCallback, Select
-    from .config import Settings
+    from .config import ConfigChange, Settings
 
 log = logging.getLogger(__name__)
 
+DB_CONNECT_SECONDS = metrics.histogram(
+    "theticketbot_db_connect_seconds",
+    "Time spent opening database connections.",
+)
+DB_CONNECTION_SECONDS = metrics.histogram(
+    "theticketbot_db_connection_seconds",
+    "Time database connections were held open.",
+)
+DB_OPEN_CONNECTIONS = metrics.gauge(
+    "theticketbot_db_open_connections",
+    "Number of database connections currently open.",
+)
+
 
 class StartupFlags(Flag):
     SYNC = auto()
     CLOSE = auto()
     SKIP_AUTO_SYNC = auto()
+    PROFILE = auto()
 
 
 # https://discordpy.readthedocs.io/en/stable/ext/commands/api.html
@@ -44,13 +73,22 @@ class Bot(commands.Bot):
         self,
         config_refresher: Callable[[], Settings],
         *,
+        config_path: Path | None = None,
         startup_flags: StartupFlags,
+        startup_profiler: StartupProfiler | None = None,
     ):
         self._config_refresher = config_refresher
+        self.config_path = config_path
+        self.config_watcher: ConfigWatcher | None = None
         config = self.refresh_config()
 
         self.startup_flags = startup_flags
+        self.startup_profiler = startup_profiler or StartupProfiler()
         self.key_pragma = None
+        self._backfill_stop = threading.Event()
+        self._backfill_task: asyncio.Task | None = None
+        self._metrics_server: metrics.MetricsServer | None = None
+        self.loop_monitor: LoopMonitor | None = None
 
         super().__init__(
             chunk_guilds_at_startup=False,
@@ -58,7 +96,13 @@ class Bot(commands.Bot):
             intents=config.bot.intents.create_intents(),
             member_cache_flags=discord.MemberCacheFlags.none(),
             strip_after_prefix=True,
+            tree_cls=CommandTree,
         )
+        EVENT_RECORDER.attach(self._connection)
+
+    @property
+    def tree(self) -> CommandTree[Self]:
+        return cast("CommandTree[Self]", super().tree)
 
     @contextlib.asynccontextmanager
     async def acquire(
@@ -76,12 +120,20 @@ class Bot(commands.Bot):
         def init(conn: sqlite3.Connection) -> None:
             self._run_config_pragmas(conn)
 
+        start = time.perf_counter()
         async with database_connect(path, init=init) as conn:
-            if not transaction:
-                yield conn
-            else:
-                async with conn.transaction():
+            opened_at = time.perf_counter()
+            DB_CONNECT_SECONDS.observe(opened_at - start)
+            DB_OPEN_CONNECTIONS.inc()
+            try:
+                if not transaction:
                     yield conn
+                else:
+                    async with conn.transaction():
+                        yield conn
+            finally:
+                DB_OPEN_CONNECTIONS.dec()
+                DB_CONNECTION_SECONDS.observe(time.perf_counter() - opened_at)
 
     def _run_config_pragmas(self, conn: sqlite3.Connection) -> None:
         pragmas = [p.get_secret_value() for p in self.config.db.pragmas]
@@ -119,31 +171,180 @@ class Bot(commands.Bot):
 
     def refresh_config(self) -> Settings:
         config = self._config_refresher()
+        self._apply_runtime_settings(config)
         self.config = config
         return config
 
+    def _apply_runtime_settings(self, config: Settings) -> None:
+        configure_log_filters(config.logging)
+        QUERY_RECORDER.slow_query_threshold = config.db.slow_query_threshold
+        configure_tracing(config.tracing)
+        configure_event_recorder(config.event_recorder)
+
+    async def reload_config(self) -> list[ConfigChange]:
+        """Reload the configuration and apply any changes that can be
+        applied at runtime.
+
+        The current configuration is kept if the new one fails to load.
+        Changed pragmas are only run on database connections opened
+        after reloading.
+
+        :returns: The changes made to the configuration.
+        :raises Exception: The configuration could not be loaded or validated.
+
+        """
+        from .config import diff_config
+
+        old = self.config
+        new = await asyncio.to_thread(self._config_refresher)
+        self._apply_runtime_settings(new)
+        self.config = new
+
+        changes = diff_config(old, new)
+
+        if len(changes) > 0:
+            log.info(
+                "Reloaded config with %d change(s):\n%s",
+                len(changes),
+                "\n".join(change.format() for change in changes),
+            )
+        else:
+            log.info("Reloaded config with no changes")
+        return changes
+
+    def _maybe_start_loop_monitor(self) -> None:
+        settings = self.config.bot.loop_monitor
+        if not settings.enabled:
+            return
+
+        self.loop_monitor = LoopMonitor(
+            interval=settings.interval,
+            threshold=settings.threshold,
+        )
+        self.loop_monitor.start()
+
+    async def _maybe_start_metrics_server(self) -> None:
+        settings = self.config.metrics
+        if not settings.serve:
+            return
+
+        server = metrics.MetricsServer(settings.host, settings.port)
+        try:
+            await server.start()
+        except OSError:
+            log.exception("Failed to start metrics server")
+        else:
+            self._metrics_server = server
+
+    def _maybe_start_config_watcher(self) -> None:
+        settings = self.config.bot.config_reload
+        if not settings.watch or self.config_path is None:
+            return
+
+        self.config_watcher = ConfigWatcher(
+            self.config_path,
+            self.reload_config,
+            interval=settings.interval,
+            debounce=settings.debounce,
+        )
+        self.config_watcher.start()
+
     async def setup_hook(self) -> None:
-        self.config.db.path.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(self.config.db.path) as conn:
-            self._run_config_pragmas(conn)
-            run_default_migrations(conn)
+        profiler = self.startup_profiler
+        self._maybe_start_loop_monitor()
 
-        for path in self.config.bot.extensions:
-            await self.load_extension(path, package=__package__)
-        log.info("Loaded %d extensions", len(self.config.bot.extensions))
-        await self._maybe_load_jishaku()
+        # Extensions don't touch the database while loading,
+        # so they can be loaded while migrations are running
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(self._setup_database())
+            tg.create_task(self._setup_extensions())
 
-        await self.tree.set_translator(FluentTranslator())
+        with profiler.phase("translator"):
+            # Bundles are loaded lazily, so check every locale upfront
+            # to avoid finding broken localizations during interactions
+            await asyncio.to_thread(fluent.check_bundles)
+            await self.tree.set_translator(FluentTranslator())
 
-        async with self.acquire() as conn:
-            await self._maybe_sync_at_startup(DatabaseClient(conn))
+        with profiler.phase("sync"):
+            async with self.acquire() as conn:
+                await self._maybe_sync_at_startup(DatabaseClient(conn))
+
+        self._maybe_start_config_watcher()
+        await self._maybe_start_metrics_server()
 
         invite_link = self.get_standard_invite()
         log.info("Invite link:\n%s", invite_link)
 
+        profiler.finish()
+        if self.startup_flags & StartupFlags.PROFILE:
+            await self._dump_startup_profile()
+
         if self.startup_flags & StartupFlags.CLOSE:
             sys.exit()
 
+    async def _setup_database(self) -> None:
+        def migrate() -> None:
+            self.config.db.path.parent.mkdir(parents=True, exist_ok=True)
+            with sqlite3.connect(self.config.db.path) as conn:
+                self._run_config_pragmas(conn)
+                run_default_migrations(conn)
+
+        with self.startup_profiler.phase("migrations"):
+            await asyncio.to_thread(migrate)
+
+        self._backfill_task = asyncio.create_task(self._run_backfills())
+
+    async def _run_backfills(self) -> None:
+        def backfill() -> None:
+            with contextlib.closing(sqlite3.connect(self.config.db.path)) as conn:
+                self._run_config_pragmas(conn)
+                run_default_backfills(conn, stop=self._backfill_stop)
+
+        try:
+            await asyncio.to_thread(backfill)
+        except Exception:
+            log.exception("Failed to backfill database")
+
+    async def close(self) -> None:
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        if self._metrics_server is not None:
+            await self._metrics_server.stop()
+        if self.loop_monitor is not None:
+            await self.loop_monitor.stop()
+
+        # Let the current backfill batch commit before closing
+        self._backfill_stop.set()
+        if self._backfill_task is not None:
+            await self._backfill_task
+
+        await super().close()
+
+    async def _setup_extensions(self) -> None:
+        with self.startup_profiler.phase("extensions"):
+            for path in self.config.bot.extensions:
+                await self.load_extension(path, package=__package__)
+            log.info("Loaded %d extensions", len(self.config.bot.extensions))
+            await self._maybe_load_jishaku()
+
+    async def _dump_startup_profile(self) -> None:
+        modules = [__name__]
+        for path in self.config.bot.extensions:
+            modules.append(importlib.util.resolve_name(path, __package__))
+
+        try:
+            import_times = await asyncio.to_thread(measure_import_times, modules)
+        except subprocess.CalledProcessError as e:
+            log.error(
+                "Failed to measure import times, writing startup profile "
+                "without them:\n%s",
+                e.stderr,
+            )
+            import_times = []
+
+        path = self.startup_profiler.dump_report(APP_DIRS.user_log_path, import_times)
+        log.info("Startup profile written to %s", path)
+
     def get_standard_invite(self) -> str:
         assert self.application is not None
         return discord.utils.oauth_url(
@@ -160,11 +361,8 @@ class Bot(commands.Bot):
         )
 
     async def _maybe_sync_at_startup(self, query: DatabaseClient) -> None:
-        from packaging.version import Version
-
-        last_version = await query.get_setting("last-sync-version", "0.0.0")
-        last_version = Version(last_version)
-        version_grade = sync_upgrade_or_downgrade(last_version, CURRENT_VERSION)
+        last_hash = await query.get_setting("last-sync-hash")
+        current_hash = await self.tree.get_sync_hash()
 
         commands = []
         reason = ""
@@ -173,18 +371,21 @@ class Bot(commands.Bot):
             reason = "manual"
         elif self.startup_flags & StartupFlags.SKIP_AUTO_SYNC:
             reason = "skip"
-        elif version_grade != 0:
+        elif last_hash != current_hash:
             commands = await self.tree.sync()
-            reason = "upgraded" if version_grade > 0 else "downgraded"
+            reason = "changed"
 
         if reason not in ("skip", ""):
             log.info("Synced %d application commands (%s)", len(commands), reason)
 
-        if reason == "skip" and last_version != CURRENT_VERSION:
-            log.info("Skipping automatic sync for current version")
-            await query.set_setting("last-sync-version", str(CURRENT_VERSION))
-        elif reason != "" and last_version != CURRENT_VERSION:
-            await query.set_setting("last-sync-version", str(CURRENT_VERSION))
+        if reason == "skip" and last_hash != current_hash:
+            log.info("Skipping automatic sync for current application commands")
+            await query.set_setting("last-sync-hash", current_hash)
+        elif reason != "" and last_hash != current_hash:
+            await query.set_setting("last-sync-hash", current_hash)
+
+        # Superseded by last-sync-hash
+        await query.delete_setting("last-sync-version")
 
 
 class Context(commands.Context[Bot]): ...
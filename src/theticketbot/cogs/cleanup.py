@@ -3,10 +3,21 @@ import logging
 import discord
 from discord.ext import commands, tasks
 
+from theticketbot import metrics
 from theticketbot.bot import Bot
 
 log = logging.getLogger(__name__)
 
+CLEANUP_EVENTS = metrics.counter(
+    "theticketbot_cleanup_events_total",
+    "Number of events handled by the cleanup listeners.",
+    labels=("event",),
+)
+CLEANUP_GUILDS_REMOVED = metrics.counter(
+    "theticketbot_cleanup_guilds_removed_total",
+    "Number of guilds removed during periodic cleanup.",
+)
+
 
 class Cleanup(commands.Cog):
     def __init__(self, bot: Bot) -> None:
@@ -23,21 +34,25 @@ class Cleanup(commands.Cog):
 
     @commands.Cog.listener("on_guild_channel_delete")
     async def remove_guild_channel(self, channel: discord.abc.GuildChannel):
+        CLEANUP_EVENTS.inc(event="guild_channel_delete")
         async with self.bot.acquire() as conn:
             await conn.execute("DELETE FROM channel WHERE id = ?", channel.id)
 
     @commands.Cog.listener("on_raw_thread_delete")
     async def remove_thread(self, payload: discord.RawThreadDeleteEvent):
+        CLEANUP_EVENTS.inc(event="raw_thread_delete")
         async with self.bot.acquire() as conn:
             await conn.execute("DELETE FROM channel WHERE id = ?", payload.thread_id)
 
     @commands.Cog.listener("on_raw_message_delete")
     async def remove_message(self, payload: discord.RawMessageDeleteEvent):
+        CLEANUP_EVENTS.inc(event="raw_message_delete")
         async with self.bot.acquire() as conn:
             await conn.execute("DELETE FROM message WHERE id = ?", payload.message_id)
 
     @commands.Cog.listener("on_raw_bulk_message_delete")
     async def bulk_remove_messages(self, payload: discord.RawBulkMessageDeleteEvent):
+        CLEANUP_EVENTS.inc(event="raw_bulk_message_delete")
         async with self.bot.acquire() as conn:
             await conn.executemany(
                 "DELETE FROM message WHERE id = ?",
@@ -61,6 +76,7 @@ class Cleanup(commands.Cog):
             rows = [(guild_id,) for guild_id in rows]
             await conn.executemany("DELETE FROM guild WHERE id = ?", rows)
 
+        CLEANUP_GUILDS_REMOVED.inc(len(rows))
         if len(rows) > 0:
             log.info("%d guilds cleaned up", len(rows))
 
@@ -10,17 +10,19 @@ from discord.ext import commands
 
 from theticketbot.bot import Bot, Context
 from theticketbot.errors import AppCommandResponse
-from theticketbot.translator import locale_str as _, translate
+from theticketbot.translator import locale_str as _, translate_many
 
 log = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
 
-async def append_error_code(ctx: object, content: str, error_code: str) -> str:
+def get_error_trailer(
+    ctx: object,
+    error_code: str,
+) -> tuple[app_commands.locale_str, Any]:
     data = {"code": error_code, "maintainer": get_owner_mention(ctx)}
-    trailer = await maybe_translate(ctx, _("error-trailer"), data)
-    return f"{content}\n{trailer}"
+    return _("error-trailer"), data
 
 
 def get_owner_mention(ctx: object) -> str:
@@ -44,20 +46,29 @@ def generate_error_code() -> str:
     return "".join(random.choices("0123456789ABCDEF", k=4))
 
 
-async def maybe_translate(
+async def maybe_translate_many(
     ctx: object,
-    message: str | app_commands.locale_str,
-    data: Any = None,
-) -> str:
-    if isinstance(message, str):
-        return message
-    elif isinstance(ctx, discord.Interaction):
-        return await translate(message, ctx, data=data)
+    messages: list[tuple[str | app_commands.locale_str, Any]],
+) -> list[str]:
+    localized = [
+        (message, data)
+        for message, data in messages
+        if isinstance(message, app_commands.locale_str)
+    ]
+
+    if isinstance(ctx, discord.Interaction):
+        translated = await translate_many(localized, ctx)
     elif isinstance(ctx, commands.Context) and ctx.guild is not None:
         locale = ctx.guild.preferred_locale
-        return await translate(message, ctx.bot, locale=locale, data=data)
+        translated = await translate_many(localized, ctx.bot, locale=locale)
     else:
-        return message.message
+        translated = [message.message for message, data in localized]
+
+    translated.reverse()
+    return [
+        message if isinstance(message, str) else translated.pop()
+        for message, data in messages
+    ]
 
 
 Placeholder = Callable[[Any, Exception], Any]
@@ -70,13 +81,23 @@ class ErrorResponse:
     show_traceback: bool
     placeholders: dict[str, Placeholder] = field(default_factory=dict)
 
-    async def format(self, ctx: Any, error: Exception) -> str | None:
+    async def format(
+        self,
+        ctx: Any,
+        error: Exception,
+        error_code: str | None = None,
+    ) -> str | None:
         if self.content is None:
             return
 
         data = {name: func(ctx, error) for name, func in self.placeholders.items()}
-        content = await maybe_translate(ctx, self.content, data)
-        return content.format(error)
+        messages: list[tuple[str | app_commands.locale_str, Any]]
+        messages = [(self.content, data)]
+        if error_code is not None:
+            messages.append(get_error_trailer(ctx, error_code))
+
+        content, *trailer = await maybe_translate_many(ctx, messages)
+        return "\n".join([content.format(error), *trailer])
 
 
 class AppCommandErrorResponse(ErrorResponse):
@@ -90,9 +111,19 @@ class AppCommandErrorResponse(ErrorResponse):
             **kwargs,
         )
 
-    async def format(self, ctx: discord.Interaction, error: Exception) -> str | None:
+    async def format(
+        self,
+        ctx: discord.Interaction,
+        error: Exception,
+        error_code: str | None = None,
+    ) -> str | None:
         assert isinstance(error, AppCommandResponse)
-        return await error.translate(ctx)
+        messages: list[tuple[str | app_commands.locale_str, Any]]
+        messages = [(error.message, error.data)]
+        if error_code is not None:
+            messages.append(get_error_trailer(ctx, error_code))
+
+        return "\n".join(await maybe_translate_many(ctx, messages))
 
 
 class ErrorHandler(ABC, Generic[T]):
@@ -127,17 +158,17 @@ class ErrorHandler(ABC, Generic[T]):
 
         for resp in self.responses:
             if isinstance(error, resp.exc_types):
-                content = await resp.format(ctx, error)
                 break
         else:
             raise TypeError(f"Unable to handle exception: {error!r}")
 
         if resp.show_traceback:
             self._log_error(ctx, error, error_code)
+            content = await resp.format(ctx, error, error_code)
+        else:
+            content = await resp.format(ctx, error)
 
         if content is not None:
-            if resp.show_traceback:
-                content = await append_error_code(ctx, content, error_code)
             await self.send(ctx, content)
 
     def _log_error(self, ctx: T, error: Exception, error_code: str) -> None:
@@ -7,6 +7,7 @@ from typing import (
     Any,
     Awaitable,
     Callable,
+    Collection,
     ParamSpec,
     TypeVar,
     TypedDict,
@@ -102,6 +103,12 @@ class InboxGroup(
     def create_inbox_view(self) -> InboxView:
         return InboxView(self.bot, ratelimit_check=self.inbox_ratelimiter)
 
+    def get_caches(self) -> dict[str, Collection[Any]]:
+        return {
+            "inbox_views": self._inbox_views,
+            "inbox_ratelimits": self.inbox_ratelimiter._inbox_ratelimits,
+        }
+
     async def cog_unload(self) -> None:
         self._global_inbox_view.stop()
         for view in self._inbox_views.values():
@@ -1,10 +1,9 @@
 import asqlite
 import discord
-from discord.app_commands import locale_str
 
 from theticketbot.bot import Bot
 from theticketbot.database import DatabaseClient
-from theticketbot.translator import locale_str as _, translate
+from theticketbot.translator import locale_str as _, translate, translate_many
 
 from .constants import DEFAULT_STARTER_CONTENT, DEFAULT_TICKET_NAME
 
@@ -25,11 +24,11 @@ class SetInboxStarterContentModal(discord.ui.Modal, title="Starter Message"):
         self.inbox = inbox
 
     async def localize(self, locale: discord.Locale) -> None:
-        async def t(s: locale_str) -> str:
-            return await translate(s, self.bot, locale=locale)
-
-        self.title = await t(_("modal-starter"))
-        self.content.text = await t(_("modal-starter.content"))
+        self.title, self.content.text = await translate_many(
+            [_("modal-starter"), _("modal-starter.content")],
+            self.bot,
+            locale=locale,
+        )
 
     async def set_defaults(self, conn: asqlite.Connection) -> None:
         assert isinstance(self.content.component, discord.ui.TextInput)
@@ -67,11 +66,11 @@ class SetTicketDefaultsModal(discord.ui.Modal, title="New Tickets"):
         self.inbox = inbox
 
     async def localize(self, locale: discord.Locale) -> None:
-        async def t(s: locale_str) -> str:
-            return await translate(s, self.bot, locale=locale)
-
-        self.title = await t(_("modal-new-tickets"))
-        self.name.text = await t(_("modal-new-tickets.name"))
+        self.title, self.name.text = await translate_many(
+            [_("modal-new-tickets"), _("modal-new-tickets.name")],
+            self.bot,
+            locale=locale,
+        )
 
     async def set_defaults(self, conn: asqlite.Connection) -> None:
         assert isinstance(self.name.component, discord.ui.TextInput)
@@ -4,11 +4,11 @@ from typing import Awaitable, Callable, Iterable
 
 import asqlite
 import discord
-from discord.app_commands import locale_str
 
+from theticketbot import metrics, tracing
 from theticketbot.bot import Bot
 from theticketbot.database import DatabaseClient
-from theticketbot.translator import locale_str as _, translate
+from theticketbot.translator import locale_str as _, translate, translate_many
 from theticketbot.views import View
 
 from .constants import DEFAULT_STARTER_CONTENT, DEFAULT_TICKET_NAME
@@ -19,6 +19,16 @@ MENTION_PATTERN = re.compile(r"<(@|@&)(\d+)>")
 
 InboxRatelimit = Callable[[discord.Message, discord.Member], Awaitable[float]]
 
+TICKET_REQUESTS = metrics.counter(
+    "theticketbot_ticket_requests_total",
+    "Number of ticket creation requests by their result.",
+    labels=("result",),
+)
+TICKET_REQUEST_SECONDS = metrics.histogram(
+    "theticketbot_ticket_request_seconds",
+    "Time spent handling ticket creation requests.",
+)
+
 
 def mention_to_snowflake(mention: str) -> discord.Object:
     m = MENTION_PATTERN.fullmatch(mention)
@@ -39,11 +49,15 @@ class InboxView(View):
         self.ratelimit_check = ratelimit_check
 
     async def localize(self, locale: discord.Locale) -> None:
-        async def t(s: locale_str) -> str:
-            return await translate(s, self.bot, locale=locale)
-
-        # Button label for creating a new ticket
-        self.create_ticket.label = await t(_("inbox-ticket-button"))
+        (label,) = await translate_many(
+            [
+                # Button label for creating a new ticket
+                _("inbox-ticket-button"),
+            ],
+            self.bot,
+            locale=locale,
+        )
+        self.create_ticket.label = label
 
     @discord.ui.button(custom_id="create-ticket", style=discord.ButtonStyle.primary)
     async def create_ticket(
@@ -51,6 +65,25 @@ class InboxView(View):
         interaction: discord.Interaction,
         button: discord.ui.Button,
     ):
+        result = "error"
+        with tracing.span(
+            "create-ticket",
+            guild_id=interaction.guild_id,
+            inbox_id=interaction.message.id if interaction.message else None,
+        ) as span:
+            try:
+                with TICKET_REQUEST_SECONDS.time():
+                    result = await self._create_ticket(interaction)
+            finally:
+                span.attributes["result"] = result
+                TICKET_REQUESTS.inc(result=result)
+
+    async def _create_ticket(self, interaction: discord.Interaction) -> str:
+        """Handle a request to create a ticket.
+
+        :returns: The result of the request, used for metrics.
+
+        """
         # FIXME: this function is too big, can we do any better?
         assert isinstance(interaction.channel, discord.TextChannel)
         assert isinstance(interaction.user, discord.Member)
@@ -60,21 +93,26 @@ class InboxView(View):
         guild = interaction.guild
         message = interaction.message
 
-        async with self.bot.acquire() as conn:
-            # If the database was wiped, this will fail.
-            row = await conn.fetchone("SELECT 1 FROM inbox WHERE id = ?", message.id)
-            if row is None:
-                content = await translate(_("inbox-ticket-unknown"), interaction)
-                return await interaction.response.send_message(content, ephemeral=True)
-
-            tickets = await self.get_active_user_tickets(
-                interaction.channel.threads,
-                conn,
-                message.id,
-                interaction.user.id,
-            )
-            tickets.sort(key=lambda t: t.id)
-            max_tickets = await self.get_max_tickets(conn, message.id)
+        with tracing.span("check-tickets"):
+            async with self.bot.acquire() as conn:
+                # If the database was wiped, this will fail.
+                row = await conn.fetchone(
+                    "SELECT 1 FROM inbox WHERE id = ?",
+                    message.id,
+                )
+                if row is None:
+                    content = await translate(_("inbox-ticket-unknown"), interaction)
+                    await interaction.response.send_message(content, ephemeral=True)
+                    return "unknown-inbox"
+
+                tickets = await self.get_active_user_tickets(
+                    interaction.channel.threads,
+                    conn,
+                    message.id,
+                    interaction.user.id,
+                )
+                tickets.sort(key=lambda t: t.id)
+                max_tickets = await self.get_max_tickets(conn, message.id)
 
         if max_tickets > 0 and len(tickets) >= max_tickets:
             content = await translate(
@@ -82,29 +120,34 @@ class InboxView(View):
                 interaction,
                 data={"ticket": tickets[-1].jump_url},
             )
-            return await interaction.response.send_message(content, ephemeral=True)
+            await interaction.response.send_message(content, ephemeral=True)
+            return "max-tickets"
 
-        retry_after = await self.ratelimit_check(message, interaction.user)
+        with tracing.span("ratelimit-check"):
+            retry_after = await self.ratelimit_check(message, interaction.user)
         if retry_after > 0:
             content = await translate(
                 _("inbox-ticket-on-cooldown"),
                 interaction,
                 data={"duration": retry_after},
             )
-            return await interaction.response.send_message(content, ephemeral=True)
+            await interaction.response.send_message(content, ephemeral=True)
+            return "ratelimited"
 
         # Message sent when creating a ticket
         content = await translate(_("inbox-ticket-creating"), interaction)
-        await interaction.response.send_message(content, ephemeral=True)
+        with tracing.span("respond-creating"):
+            await interaction.response.send_message(content, ephemeral=True)
 
-        async with self.bot.acquire() as conn:
-            query = DatabaseClient(conn)
-            destination = await get_inbox_destination(query, interaction.guild, message)
-            ticket_name = await query.get_inbox_default_ticket_name(message.id)
-            ticket_name = ticket_name or DEFAULT_TICKET_NAME
+        with tracing.span("prepare-ticket"):
+            async with self.bot.acquire() as conn:
+                query = DatabaseClient(conn)
+                destination = await get_inbox_destination(query, guild, message)
+                ticket_name = await query.get_inbox_default_ticket_name(message.id)
+                ticket_name = ticket_name or DEFAULT_TICKET_NAME
 
-            # NOTE: counter may skip if thread creation fails
-            counter = await query.increment_inbox_counter(message.id)
+                # NOTE: counter may skip if thread creation fails
+                counter = await query.increment_inbox_counter(message.id)
 
         created_at = interaction.created_at
         ticket_name = string.Template(ticket_name).safe_substitute(
@@ -123,38 +166,47 @@ class InboxView(View):
         )
 
         try:
-            ticket = await destination.create_thread(
-                name=ticket_name[:100],
-                invitable=False,
-                reason=reason,
-            )
-
-            async with self.bot.acquire() as conn:
-                query = DatabaseClient(conn)
-                await query.add_ticket(
-                    ticket_id=ticket.id,
-                    inbox_id=message.id,
-                    owner_id=interaction.user.id,
-                    guild_id=guild.id,
+            with tracing.span("create-thread"):
+                ticket = await destination.create_thread(
+                    name=ticket_name[:100],
+                    invitable=False,
+                    reason=reason,
                 )
 
-            async with self.bot.acquire() as conn:
-                query = DatabaseClient(conn)
-                mentions = await get_and_filter_inbox_staff(query, guild, message.id)
-                mentions = " ".join(mentions)
-
-                starter_content = await query.get_inbox_starter_content(message.id)
-                starter_content = starter_content or DEFAULT_STARTER_CONTENT
+            with tracing.span("add-ticket"):
+                async with self.bot.acquire() as conn:
+                    query = DatabaseClient(conn)
+                    await query.add_ticket(
+                        ticket_id=ticket.id,
+                        inbox_id=message.id,
+                        owner_id=interaction.user.id,
+                        guild_id=guild.id,
+                    )
+
+            with tracing.span("staff-lookup"):
+                async with self.bot.acquire() as conn:
+                    query = DatabaseClient(conn)
+                    mentions = await get_and_filter_inbox_staff(
+                        query,
+                        guild,
+                        message.id,
+                    )
+                    mentions = " ".join(mentions)
+
+                    starter_content = await query.get_inbox_starter_content(message.id)
+                    starter_content = starter_content or DEFAULT_STARTER_CONTENT
 
             content = string.Template(starter_content).safe_substitute(
                 author=interaction.user.mention,
                 staff=mentions,
             )
-            await ticket.send(content[:2000])
+            with tracing.span("send-starter"):
+                await ticket.send(content[:2000])
         except discord.Forbidden:
             content = _("inbox-ticket-error-insufficient-bot-permissions")
             content = await translate(content, interaction)
-            return await interaction.edit_original_response(content=content)
+            await interaction.edit_original_response(content=content)
+            return "forbidden"
         except Exception:
             content = await translate(_("inbox-ticket-error-unknown"), interaction)
             await interaction.edit_original_response(content=content)
@@ -165,7 +217,9 @@ class InboxView(View):
                 interaction,
                 data={"ticket": ticket.jump_url},
             )
-            await interaction.edit_original_response(content=content)
+            with tracing.span("edit-response"):
+                await interaction.edit_original_response(content=content)
+            return "created"
 
     async def get_active_user_tickets(
         self,
@@ -1,8 +1,22 @@
+import asyncio
+import datetime
+import io
+import threading
+
 import discord
+import humanize
 from discord import app_commands
 from discord.ext import commands
 
+from theticketbot import metrics
+from theticketbot.appdirs import APP_DIRS
 from theticketbot.bot import Bot, Context
+from theticketbot.database import DatabaseClient
+from theticketbot.memory import MemoryTracer, get_cache_sizes, get_rss
+from theticketbot.profiling import SamplingProfiler
+from theticketbot.query_stats import RECORDER as QUERY_RECORDER, QuerySortKey
+from theticketbot.tracing import TRACER, format_trace
+from theticketbot.translator import fluent
 
 
 def count_localizations(command: app_commands.AppCommand) -> int:
@@ -24,9 +38,43 @@ def count_localizations(command: app_commands.AppCommand) -> int:
     return n
 
 
+async def reply_report(
+    ctx: Context,
+    text: str,
+    filename: str,
+    *,
+    header: str | None = None,
+) -> None:
+    """Reply with the given text in a code block, or as a file attachment
+    if it's too long to fit in a message.
+
+    :param ctx: The context to reply to.
+    :param text: The text of the report.
+    :param filename: The name of the file to attach if the text is too long.
+    :param header: An optional line to send before the report.
+
+    """
+    if len(text) <= 1900:
+        content = f"```\n{text}\n```"
+        if header is not None:
+            content = f"{header}\n{content}"
+        await ctx.reply(content)
+    else:
+        file = discord.File(io.BytesIO(text.encode()), filename=filename)
+        await ctx.reply(header, file=file)
+
+
 class Owner(commands.Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self._profiler: SamplingProfiler | None = None
+        self._memory_tracer = MemoryTracer()
+
+    async def cog_unload(self) -> None:
+        if self._profiler is not None:
+            self._profiler.stop()
+        if self._memory_tracer.is_tracing:
+            self._memory_tracer.stop()
 
     async def cog_check(self, ctx: Context):  # type: ignore  # async is allowed
         return await commands.is_owner().predicate(ctx)
@@ -34,8 +82,179 @@ class Owner(commands.Cog):
     @commands.command(name="reload-config", aliases=["config-reload"])
     async def reload_config(self, ctx: Context):
         """Reload the bot's configuration."""
-        self.bot.refresh_config()
-        await ctx.reply("Config reloaded!")
+        changes = await self.bot.reload_config()
+        if len(changes) == 0:
+            return await ctx.reply("Config reloaded with no changes!")
+
+        diff = "\n".join(change.format() for change in changes)
+        await reply_report(ctx, diff, "changes.txt", header="Config reloaded!")
+
+    @commands.command(name="reload-translations", aliases=["translations-reload"])
+    async def reload_translations(self, ctx: Context):
+        """Reload the bot's localization files and clear cached translations."""
+        await asyncio.to_thread(fluent.reload)
+        try:
+            await asyncio.to_thread(fluent.check_bundles)
+        except ValueError as e:
+            return await ctx.reply(
+                "Translations reloaded, but some locales will fall back to en-US:",
+                file=discord.File(io.BytesIO(str(e).encode()), filename="errors.txt"),
+            )
+        await ctx.reply("Translations reloaded!")
+
+    @commands.command(name="memory")
+    async def show_memory(self, ctx: Context):
+        """Show the number of entries and approximate size of each cache."""
+        caches = await get_cache_sizes(self.bot)
+        caches.sort(key=lambda cache: cache.size, reverse=True)
+
+        rss = get_rss()
+        lines = [
+            f"RSS: {humanize.naturalsize(rss, binary=True)}"
+            if rss is not None
+            else "RSS: unknown",
+            f"Tracing allocations: {self._memory_tracer.is_tracing}",
+            "",
+            "    Entries       Size  Cache",
+        ]
+        for cache in caches:
+            size = humanize.naturalsize(cache.size, binary=True)
+            lines.append(f"{cache.entries:>11,} {size:>10}  {cache.name}")
+
+        report = "\n".join(lines)
+        await reply_report(ctx, report, "memory.txt")
+
+    @commands.command(name="memory-snapshot")
+    async def memory_snapshot(
+        self,
+        ctx: Context,
+        n: commands.Range[int, 1, 50] = 10,
+    ):
+        """Take a snapshot of memory allocations and show the N locations
+        that changed the most since the last snapshot.
+
+        Allocations are traced starting from the first snapshot
+        until the memory-stop command is used.
+        """
+        if not self._memory_tracer.is_tracing:
+            self._memory_tracer.start()
+
+        diffs = await asyncio.to_thread(self._memory_tracer.take_snapshot, n)
+
+        lines = ["      Size      Change   Blocks  Location"]
+        for diff in diffs:
+            size = humanize.naturalsize(diff.size, binary=True)
+            change = humanize.naturalsize(abs(diff.size_diff), binary=True)
+            sign = "-" if diff.size_diff < 0 else "+"
+            lines.append(
+                f"{size:>10} {sign}{change:>10} {diff.blocks:>8,}  {diff.location}"
+            )
+
+        report = "\n".join(lines)
+        await reply_report(ctx, report, "memory.txt")
+
+    @commands.command(name="memory-stop")
+    async def memory_stop(self, ctx: Context):
+        """Stop tracing memory allocations and discard the last snapshot."""
+        if not self._memory_tracer.is_tracing:
+            return await ctx.reply("Memory allocations are not being traced.")
+
+        self._memory_tracer.stop()
+        await ctx.reply("Stopped tracing memory allocations!")
+
+    @commands.command(name="metrics")
+    async def show_metrics(self, ctx: Context, prefix: str = ""):
+        """Show the bot's metrics, optionally filtered by a name prefix."""
+        exposition = metrics.REGISTRY.expose(prefix)
+        await reply_report(ctx, exposition.rstrip("\n"), "metrics.txt")
+
+    @commands.command(name="profile")
+    async def profile(
+        self,
+        ctx: Context,
+        seconds: commands.Range[float, 1, 300] = 30,
+        all_threads: bool = False,
+    ):
+        """Sample the bot's call stacks for N seconds and write them
+        to the log directory in the collapsed stack format.
+
+        Only the event loop's thread is sampled unless all_threads is True.
+        """
+        if self._profiler is not None:
+            return await ctx.reply("A profile is already running!")
+
+        thread_ids = None if all_threads else [threading.get_ident()]
+        profiler = SamplingProfiler(thread_ids=thread_ids)
+        self._profiler = profiler
+
+        await ctx.reply(f"Profiling for {seconds:g} seconds...")
+        try:
+            await asyncio.to_thread(profiler.run, seconds)
+            path = await asyncio.to_thread(
+                profiler.dump_collapsed,
+                APP_DIRS.user_log_path,
+            )
+        finally:
+            self._profiler = None
+
+        lines = [f"{count:>7} {frame}" for frame, count in profiler.get_top_frames(10)]
+        top = "\n".join(lines)
+        await ctx.reply(
+            f"Collected {profiler.samples} samples, written to `{path}`\n"
+            f"```\n  Count Top frame\n{top}\n```"
+        )
+
+    @commands.command(name="queries")
+    async def show_queries(
+        self,
+        ctx: Context,
+        sort: QuerySortKey = "total",
+        n: commands.Range[int, 1, 50] = 10,
+    ):
+        """Show the top N database queries by total, mean, or max time,
+        number of calls, or time spent waiting in the queue.
+        """
+        stats = QUERY_RECORDER.get_top(n, sort)
+        if len(stats) == 0:
+            return await ctx.reply("No queries have been recorded yet.")
+
+        lines = ["  Calls    Total     Mean      Max     Wait  Query"]
+        for stat in stats:
+            lines.append(
+                f"{stat.calls:>7} {stat.total_time:>7.3f}s {stat.mean_time:>7.4f}s "
+                f"{stat.max_time:>7.4f}s {stat.total_wait:>7.3f}s  {stat.sql}"
+            )
+
+        report = "\n".join(lines)
+        await reply_report(ctx, report, "queries.txt")
+
+    @commands.command(name="reset-queries", aliases=["queries-reset"])
+    async def reset_queries(self, ctx: Context):
+        """Reset the recorded database query statistics."""
+        QUERY_RECORDER.reset()
+        await ctx.reply("Query statistics reset!")
+
+    @commands.command(name="traces")
+    async def show_traces(
+        self,
+        ctx: Context,
+        n: commands.Range[int, 1, 20] = 5,
+        name: str | None = None,
+    ):
+        """Show the N slowest recent traces, optionally filtered by name."""
+        traces = TRACER.get_slowest(n, name)
+        if len(traces) == 0:
+            return await ctx.reply("No traces have been recorded yet.")
+
+        sections = []
+        for trace in traces:
+            created_at = datetime.datetime.fromtimestamp(trace.created_at)
+            created = created_at.strftime("%Y-%m-%d %H:%M:%S")
+            attributes = " ".join(f"{k}={v}" for k, v in trace.attributes.items())
+            sections.append(f"{created} {attributes}\n{format_trace(trace)}")
+
+        report = "\n\n".join(sections)
+        await reply_report(ctx, report, "traces.txt")
 
     @commands.command(name="sync")
     async def sync(self, ctx: Context, guild_id: int | None = None):
@@ -45,6 +264,12 @@ class Owner(commands.Cog):
             guild = discord.Object(guild_id)
 
         commands = await ctx.bot.tree.sync(guild=guild)
+        if guild is None:
+            # Prevent the next startup from syncing the same commands again
+            current_hash = await ctx.bot.tree.get_sync_hash()
+            async with ctx.bot.acquire() as conn:
+                await DatabaseClient(conn).set_setting("last-sync-hash", current_hash)
+
         n_commands = len(commands)
         n_localizations = sum(map(count_localizations, commands))
         await ctx.send(
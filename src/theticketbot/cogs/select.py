@@ -1,16 +1,27 @@
 import time
 from dataclasses import dataclass
-from typing import Any, Awaitable, Callable
+from typing import Any, Awaitable, Callable, Collection
 
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
 
+from theticketbot import metrics
 from theticketbot.bot import Bot
 from theticketbot.translator import locale_str as _, translate
 
 MessageCallback = Callable[[discord.Interaction, discord.Message], Awaitable[Any]]
 
+MESSAGE_COMMANDS = metrics.gauge(
+    "theticketbot_message_commands",
+    "Number of message commands waiting for a message to be selected.",
+)
+MESSAGE_SELECTIONS = metrics.counter(
+    "theticketbot_message_selections_total",
+    "Number of messages selected by their result.",
+    labels=("result",),
+)
+
 
 @dataclass
 class MessageCommand:
@@ -47,6 +58,10 @@ class Select(commands.Cog):
         """Set the next message callback for the given user."""
         key = (guild_id, user_id)
         self._message_commands[key] = MessageCommand(time.monotonic(), callback)
+        MESSAGE_COMMANDS.set(len(self._message_commands))
+
+    def get_caches(self) -> dict[str, Collection[Any]]:
+        return {"message_commands": self._message_commands}
 
     async def cog_unload(self) -> None:
         for menu in self.cog_menus:
@@ -64,9 +79,11 @@ class Select(commands.Cog):
         command = self._message_commands.get(key)
 
         if command is None:
+            MESSAGE_SELECTIONS.inc(result="no-command")
             content = await translate(_("select-no-command"), interaction)
             return await interaction.response.send_message(content, ephemeral=True)
         elif time.monotonic() > command.timestamp + self.MESSAGE_EXPIRES_AFTER:
+            MESSAGE_SELECTIONS.inc(result="expired")
             content = await translate(_("select-expired"), interaction)
             return await interaction.response.send_message(content, ephemeral=True)
 
@@ -74,9 +91,14 @@ class Select(commands.Cog):
         try:
             await command.callback(interaction, message)
         except BaseException:
+            MESSAGE_SELECTIONS.inc(result="error")
             command.timestamp = time.monotonic()
             self._message_commands.setdefault(key, command)
             raise
+        else:
+            MESSAGE_SELECTIONS.inc(result="completed")
+        finally:
+            MESSAGE_COMMANDS.set(len(self._message_commands))
 
     @tasks.loop(seconds=CLEANUP_INTERVAL)
     async def cleanup_loop(self) -> None:
@@ -91,6 +113,8 @@ class Select(commands.Cog):
         for key in to_remove:
             del self._message_commands[key]
 
+        MESSAGE_COMMANDS.set(len(self._message_commands))
+
 
 async def setup(bot: Bot):
     await bot.add_cog(Select(bot))
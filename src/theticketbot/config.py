@@ -3,13 +3,14 @@ from __future__ import annotations
 import importlib.resources
 import tomllib
 from pathlib import Path
-from typing import IO, TYPE_CHECKING, Annotated, Any, Literal, Protocol
+from typing import IO, TYPE_CHECKING, Annotated, Any, Literal, NamedTuple, Protocol
 
 from pydantic import (
     AfterValidator,
     BaseModel,
     BeforeValidator,
     ConfigDict,
+    Field,
     SecretStr,
     ValidationInfo,
     ValidatorFunctionWrapHandler,
@@ -27,23 +28,39 @@ CONFIG_DEFAULT_RESOURCE = _package_files.joinpath("config_default.toml")
 
 
 class _BaseModel(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+    # Inputs may include secrets, which shouldn't end up in logs
+    model_config = ConfigDict(extra="forbid", hide_input_in_errors=True)
 
 
 # https://docs.pydantic.dev/usage/settings/
 class Settings(_BaseModel):
     bot: SettingsBot
     db: SettingsDB
+    event_recorder: SettingsEventRecorder
+    logging: SettingsLogging
+    metrics: SettingsMetrics
+    tracing: SettingsTracing
 
 
 class SettingsBot(_BaseModel):
     allow_jishaku: bool
     extensions: list[str]
+    config_reload: SettingsBotConfigReload
     inbox: SettingsBotInbox
     intents: SettingsBotIntents
+    loop_monitor: SettingsBotLoopMonitor
     token: str
 
 
+class SettingsBotConfigReload(_BaseModel):
+    watch: bool
+    """If True, the config file is automatically reloaded when it changes."""
+    interval: float
+    """The number of seconds between checks for changes."""
+    debounce: float
+    """The number of seconds the file must remain unchanged before reloading."""
+
+
 class SettingsBotInbox(_BaseModel):
     max_attachment_size: int
     """The max cumulative size allowed for an inbox message's attachments."""
@@ -64,6 +81,15 @@ class SettingsBotIntents(_BaseModel):
         return discord.Intents(**self.model_dump())
 
 
+class SettingsBotLoopMonitor(_BaseModel):
+    enabled: bool
+    """If True, event loop lag is measured and blocking calls are logged."""
+    interval: Annotated[float, Field(gt=0)]
+    """The number of seconds between each lag measurement."""
+    threshold: Annotated[float, Field(gt=0)]
+    """The number of seconds the event loop can be blocked before logging its stack."""
+
+
 def expand_app_dirs_strict(s: str) -> str:
     try:
         return expand_app_dirs(s, strict=True)
@@ -112,11 +138,150 @@ class SettingsDB(_BaseModel):
         WrapValidator(pass_through_empty_string),
     ]
     """The pragma template used to prompt for the passphrase upon startup."""
+    slow_query_threshold: Annotated[float, Field(ge=0)]
+    """The number of seconds a query can take before being logged as slow.
+
+    Set to 0 to disable logging slow queries.
+
+    """
+
+
+class SettingsEventRecorder(_BaseModel):
+    file: Annotated[str, BeforeValidator(expand_app_dirs_strict)]
+    """The JSONL file to record gateway events to, or an empty string to disable."""
+    events: list[str]
+    """The names of the gateway events to record, like ``THREAD_UPDATE``."""
+
+
+class SettingsLogging(_BaseModel):
+    flood_window: Annotated[float, Field(gt=0)]
+    """The number of seconds in which repeated messages are counted."""
+    flood_burst: Annotated[int, Field(ge=1)]
+    """The number of repeated messages allowed before suppressing the rest."""
+    sampling: dict[str, Annotated[float, Field(ge=0, le=1)]]
+    """A mapping of logger names to the fraction of their records to keep.
+
+    Records at ERROR level or above are always kept.
+
+    """
+
+
+class SettingsMetrics(_BaseModel):
+    serve: bool
+    """If True, metrics are served over HTTP at ``/metrics``."""
+    host: str
+    """The host to serve metrics on."""
+    port: Annotated[int, Field(ge=0, le=65535)]
+    """The port to serve metrics on."""
+
+
+class SettingsTracing(_BaseModel):
+    buffer_size: Annotated[int, Field(ge=1)]
+    """The number of recent traces to keep in memory."""
+    file: Annotated[str, BeforeValidator(expand_app_dirs_strict)]
+    """The JSONL file to append finished traces to, or an empty string to disable."""
 
 
 Settings.model_rebuild()
 SettingsBot.model_rebuild()
 
+SECRET_KEYS = frozenset({"bot.token"})
+"""Keys whose values should be masked when displayed.
+
+Values stored as :class:`SecretStr` are always masked.
+
+"""
+
+RESTART_KEYS = (
+    "bot.allow_jishaku",
+    "bot.config_reload",
+    "bot.extensions",
+    "bot.intents",
+    "bot.loop_monitor",
+    "bot.token",
+    "db.key_template",
+    "db.path",
+    "metrics",
+)
+"""Keys (and their children) which only take effect after restarting."""
+
+NEW_CONNECTION_KEYS = ("db.pragmas",)
+"""Keys (and their children) which only take effect on new database connections."""
+
+_MISSING: Any = object()
+
+
+class ConfigChange(NamedTuple):
+    key: str
+    old: Any
+    new: Any
+
+    @property
+    def requires_restart(self) -> bool:
+        return self._matches(RESTART_KEYS)
+
+    @property
+    def requires_new_connection(self) -> bool:
+        return self._matches(NEW_CONNECTION_KEYS)
+
+    def format(self) -> str:
+        """Format this change for display, masking any secrets."""
+        if self.key in SECRET_KEYS:
+            old = new = "**********"
+        else:
+            old = _format_value(self.old)
+            new = _format_value(self.new)
+
+        line = f"{self.key}: {old} -> {new}"
+        if self.requires_restart:
+            line += " (requires restart)"
+        elif self.requires_new_connection:
+            line += " (applies to new connections only)"
+        return line
+
+    def _matches(self, keys: tuple[str, ...]) -> bool:
+        return any(self.key == key or self.key.startswith(key + ".") for key in keys)
+
+
+def _format_value(value: Any) -> str:
+    if isinstance(value, SecretStr):
+        return str(value)
+    elif isinstance(value, list):
+        return "[" + ", ".join(map(_format_value, value)) + "]"
+    elif value is _MISSING:
+        return "(unset)"
+    return repr(value)
+
+
+def _flatten(data: dict[str, Any], prefix: str = "") -> dict[str, Any]:
+    flattened: dict[str, Any] = {}
+    for k, v in data.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict) and len(v) > 0:
+            flattened.update(_flatten(v, key + "."))
+        else:
+            flattened[key] = v
+    return flattened
+
+
+def diff_config(old: Settings, new: Settings) -> list[ConfigChange]:
+    """Return the differences between two configurations.
+
+    Nested tables are compared key by key, while lists are compared
+    as a whole.
+
+    """
+    old_data = _flatten(old.model_dump())
+    new_data = _flatten(new.model_dump())
+
+    changes: list[ConfigChange] = []
+    for key in sorted(old_data.keys() | new_data.keys()):
+        old_value = old_data.get(key, _MISSING)
+        new_value = new_data.get(key, _MISSING)
+        if old_value != new_value:
+            changes.append(ConfigChange(key, old_value, new_value))
+    return changes
+
 
 class OpenableBinary(Protocol):
     def open(self, __mode: Literal["rb"], /) -> IO[bytes]: ...
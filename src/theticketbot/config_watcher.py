@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+_FileState = tuple[int, int] | None
+
+
+class ConfigWatcher:
+    """Polls a config file for changes and invokes a callback afterwards.
+
+    Editors often write a file in several steps, so the callback is only
+    invoked once the file's modification time and size have stopped
+    changing for the debounce period.
+
+    :param path: The file to watch.
+    :param callback: The coroutine function to call after the file changes.
+    :param interval: The number of seconds between checks for changes.
+    :param debounce:
+        The number of seconds the file must remain unchanged
+        before invoking the callback.
+
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        callback: Callable[[], Awaitable[object]],
+        *,
+        interval: float,
+        debounce: float,
+    ) -> None:
+        self.path = path
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_file_state(self) -> _FileState:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    async def wait_for_change(self, last_state: _FileState) -> _FileState:
+        """Wait for the file to change and then settle.
+
+        :returns: The settled state of the file.
+
+        """
+        state = last_state
+        while state == last_state:
+            await asyncio.sleep(self.interval)
+            state = self.get_file_state()
+
+        while True:
+            await asyncio.sleep(self.debounce)
+            settled_state = self.get_file_state()
+            if settled_state == state:
+                return state
+            state = settled_state
+
+    async def _run(self) -> None:
+        log.debug("Watching %s for changes", self.path)
+        state = self.get_file_state()
+        while True:
+            state = await self.wait_for_change(state)
+            if state is None:
+                # Likely being replaced, wait for the new file instead
+                continue
+
+            log.info("Detected changes to %s, reloading", self.path)
+            try:
+                await self.callback()
+            except Exception:
+                log.exception("Failed to reload %s", self.path)
@@ -5,6 +5,8 @@ from typing import Any, Callable, overload
 
 import asqlite
 
+from .query_stats import TimedWorker
+
 INBOX_STAFF_MENTION_PATTERN = re.compile(r"<@\d+>|<@&\d+>")
 
 
@@ -344,8 +346,9 @@ def connect(
     # This is a monkeypatch of asqlite's connect() function since the init=
     # callback doesn't run before asqlite's own pragmas, which caused
     # connections to fail on encrypted databases.
+    # Also replaces asqlite's worker to record query timings
     loop = loop or asyncio.get_event_loop()
-    queue = asqlite._Worker(loop=loop)
+    queue = TimedWorker(loop=loop)
     queue.start()
 
     def factory(con: sqlite3.Connection) -> asqlite.Connection:
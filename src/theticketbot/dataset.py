@@ -0,0 +1,264 @@
+"""Generate synthetic databases for benchmarking and rehearsing migrations.
+
+Guild sizes, the popularity of each inbox within a guild, and the number
+of tickets opened by each member follow Zipf distributions, so a few
+guilds, inboxes, and members account for most of the data like they
+would in production.
+
+"""
+
+import itertools
+import logging
+import random
+import sqlite3
+import time
+from typing import NamedTuple
+
+from .migrations import MigrationFinder, Migrations, Migrator
+
+log = logging.getLogger(__name__)
+
+# Roughly where Discord snowflakes were in 2024, so IDs have a realistic size
+_FIRST_ID = 1_200_000_000_000_000_000
+
+_BATCH_SIZE = 100_000
+
+
+class DatasetOptions(NamedTuple):
+    guilds: int = 100
+    members_per_guild: float = 500
+    """The mean number of members in each guild."""
+    inboxes_per_guild: int = 2
+    staff_per_inbox: int = 2
+    tickets_per_owner: float = 2
+    """The mean number of tickets created by each member."""
+    exponent: float = 1.1
+    """The exponent of the Zipf distributions. Higher values are more skewed."""
+    schema_version: int | None = None
+    """The schema version to generate, or None for the latest version."""
+    seed: int | None = None
+
+
+class DatasetSummary(NamedTuple):
+    guilds: int
+    users: int
+    inboxes: int
+    staff: int
+    tickets: int
+    duration: float
+
+
+def zipf_weights(n: int, exponent: float) -> list[float]:
+    """Return the weights of N ranks in a Zipf distribution."""
+    return [1 / rank**exponent for rank in range(1, n + 1)]
+
+
+def distribute(total: int, n: int, exponent: float, rng: random.Random) -> list[int]:
+    """Split a total between N buckets following a Zipf distribution.
+
+    Buckets are shuffled so the largest ones aren't always first.
+
+    """
+    if n == 0:
+        return []
+
+    weights = zipf_weights(n, exponent)
+    weight_total = sum(weights)
+    counts = [int(total * weight / weight_total) for weight in weights]
+
+    # Give whatever was lost to rounding to the largest buckets
+    for i in range(total - sum(counts)):
+        counts[i % n] += 1
+
+    rng.shuffle(counts)
+    return counts
+
+
+class DatasetGenerator:
+    """Populates an empty SQLite database with synthetic data.
+
+    Rows are inserted in batches within a single transaction, with
+    journaling and syncing disabled, so the database may be corrupted
+    if generation is interrupted.
+
+    """
+
+    def __init__(self, conn: sqlite3.Connection, options: DatasetOptions) -> None:
+        self.conn = conn
+        self.options = options
+        self.random = random.Random(options.seed)
+        self._ids = itertools.count(_FIRST_ID)
+        self._rows: dict[str, list[tuple]] = {}
+        self._statements: dict[str, str] = {}
+
+    def generate(self) -> DatasetSummary:
+        """Migrate the database and generate the dataset.
+
+        :raises ValueError:
+            The database is not empty, or the schema version is unknown.
+
+        """
+        start = time.perf_counter()
+        self._migrate()
+
+        has_counter = self._has_column("inbox", "counter")
+        self._statements = {
+            "guild": "INSERT INTO guild (id) VALUES (?)",
+            "user": "INSERT INTO user (id) VALUES (?)",
+            "member": "INSERT INTO member (guild_id, user_id) VALUES (?, ?)",
+            "channel": "INSERT INTO channel (id, guild_id) VALUES (?, ?)",
+            "message": "INSERT INTO message (id, channel_id) VALUES (?, ?)",
+            "inbox": (
+                "INSERT INTO inbox (id, counter) VALUES (?, ?)"
+                if has_counter
+                else "INSERT INTO inbox (id) VALUES (?)"
+            ),
+            "inbox_staff": "INSERT INTO inbox_staff (inbox_id, mention) VALUES (?, ?)",
+            "ticket": "INSERT INTO ticket (id, inbox_id, owner_id) VALUES (?, ?, ?)",
+        }
+        self._rows = {table: [] for table in self._statements}
+
+        options = self.options
+        total_members = round(options.guilds * options.members_per_guild)
+        guild_sizes = distribute(
+            total_members - options.guilds,
+            options.guilds,
+            options.exponent,
+            self.random,
+        )
+
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("BEGIN")
+        try:
+            counts = [0, 0, 0, 0]
+            for i, size in enumerate(guild_sizes, start=1):
+                guild_counts = self._add_guild(size + 1, has_counter=has_counter)
+                counts = [a + b for a, b in zip(counts, guild_counts)]
+                if i % 1000 == 0:
+                    log.info("Generated %d/%d guilds", i, options.guilds)
+
+            for table in self._rows:
+                self._flush(table)
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        self.conn.execute("ANALYZE")
+        users, inboxes, staff, tickets = counts
+        return DatasetSummary(
+            guilds=options.guilds,
+            users=users,
+            inboxes=inboxes,
+            staff=staff,
+            tickets=tickets,
+            duration=time.perf_counter() - start,
+        )
+
+    def _add_guild(self, members: int, *, has_counter: bool) -> tuple[int, ...]:
+        options = self.options
+        guild_id = self._next_id()
+        self._add_row("guild", guild_id)
+
+        user_ids = [self._next_id() for _ in range(members)]
+        for user_id in user_ids:
+            self._add_row("user", user_id)
+            self._add_row("member", guild_id, user_id)
+
+        # All inboxes are sent in one channel, like a support channel would
+        channel_id = self._next_id()
+        self._add_row("channel", channel_id, guild_id)
+        inbox_ids = [self._next_id() for _ in range(options.inboxes_per_guild)]
+        inbox_weights = list(
+            itertools.accumulate(zipf_weights(len(inbox_ids), options.exponent))
+        )
+        inbox_counters = dict.fromkeys(inbox_ids, 0)
+
+        tickets = 0
+        ticket_counts = distribute(
+            round(members * options.tickets_per_owner),
+            members,
+            options.exponent,
+            self.random,
+        )
+        for user_id, count in zip(user_ids, ticket_counts):
+            if len(inbox_ids) == 0:
+                break
+
+            for inbox_id in self.random.choices(
+                inbox_ids,
+                cum_weights=inbox_weights,
+                k=count,
+            ):
+                ticket_id = self._next_id()
+                self._add_row("channel", ticket_id, guild_id)
+                self._add_row("ticket", ticket_id, inbox_id, user_id)
+                inbox_counters[inbox_id] += 1
+                tickets += 1
+
+        for inbox_id, counter in inbox_counters.items():
+            self._add_row("message", inbox_id, channel_id)
+            if has_counter:
+                self._add_row("inbox", inbox_id, counter)
+            else:
+                self._add_row("inbox", inbox_id)
+
+            for _ in range(options.staff_per_inbox):
+                self._add_row("inbox_staff", inbox_id, f"<@&{self._next_id()}>")
+
+        return (
+            members,
+            len(inbox_ids),
+            len(inbox_ids) * options.staff_per_inbox,
+            tickets,
+        )
+
+    def _add_row(self, table: str, *row: object) -> None:
+        rows = self._rows[table]
+        rows.append(row)
+        if len(rows) >= _BATCH_SIZE:
+            self._flush(table)
+
+    def _flush(self, table: str) -> None:
+        # Foreign keys aren't enforced, so tables can be flushed in any order
+        self.conn.executemany(self._statements[table], self._rows[table])
+        self._rows[table].clear()
+
+    def _next_id(self) -> int:
+        # Snowflakes are increasing, which keeps inserts at the end of each table
+        return next(self._ids)
+
+    def _has_column(self, table: str, column: str) -> bool:
+        rows = self.conn.execute(f"PRAGMA table_info({table})").fetchall()
+        return any(row[1] == column for row in rows)
+
+    def _migrate(self) -> None:
+        migrator = Migrator(self.conn)
+        if migrator.get_version() != 0:
+            raise ValueError("The database must be empty")
+
+        migrations = MigrationFinder().discover()
+        version = self.options.schema_version
+        if version is not None:
+            if not migrations.version_exists(version):
+                raise ValueError(f"Unknown schema version: {version}")
+            migrations = Migrations(m for m in migrations if m.version <= version)
+
+        migrator.run_migrations(migrations)
+
+
+def generate_dataset(
+    conn: sqlite3.Connection,
+    options: DatasetOptions,
+) -> DatasetSummary:
+    """Generate a synthetic dataset in an empty database.
+
+    :param conn: The connection to the database. Foreign keys must not be enforced.
+    :param options: The options for generating the dataset.
+    :returns: The number of rows generated.
+    :raises ValueError:
+        The database is not empty, or the schema version is unknown.
+
+    """
+    return DatasetGenerator(conn, options).generate()
@@ -0,0 +1,166 @@
+"""Record gateway events to a JSONL file for replaying them later.
+
+Each line of the file is a JSON object with the time the event was
+received (``t``), the event name (``event``), and its anonymized payload
+(``data``). Recording is done by wrapping discord.py's event parsers, so
+events are recorded exactly as they were received from the gateway.
+
+Payloads are anonymized before being written:
+
+- Snowflakes are replaced with a keyed hash, so the same ID is always
+  replaced with the same value within a process. The bot's own ID is
+  replaced with :data:`SELF_ID`.
+- Strings are replaced with ``x`` characters of the same length, except
+  for timestamps, locales, and numeric strings like permissions.
+
+"""
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import re
+import secrets
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+from .jsonl import JSONLWriter
+
+if TYPE_CHECKING:
+    from discord.state import ConnectionState
+
+    from .config import SettingsEventRecorder
+
+log = logging.getLogger(__name__)
+
+SELF_ID = "@me"
+"""The anonymized ID of the bot user.
+
+This isn't a valid snowflake, so it can't be confused with any other value
+that is kept when anonymizing, and must be replaced before replaying events.
+
+"""
+
+_SNOWFLAKE_PATTERN = re.compile(r"\d{15,20}")
+_TIMESTAMP_PATTERN = re.compile(
+    r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(\.\d+)?(Z|[+-]\d\d:\d\d)"
+)
+_KEPT_STRING_KEYS = frozenset({"locale", "preferred_locale", "rtc_region"})
+_NUMERIC_KEYS = frozenset({"allow", "deny", "permissions"})
+
+
+class EventRecorder:
+    """Records anonymized gateway events to a JSONL file.
+
+    Nothing is recorded until the recorder is attached to the bot's
+    connection state and configured with a file to write to.
+
+    """
+
+    MAX_FILE_SIZE = 50_000_000
+
+    def __init__(self) -> None:
+        self.path: Path | None = None
+        self.events: frozenset[str] = frozenset()
+
+        self._state: ConnectionState | None = None
+        self._originals: dict[str, Callable[[Any], None]] = {}
+        self._key = secrets.token_bytes(32)
+        self._writer = JSONLWriter("event-writer", self.MAX_FILE_SIZE)
+
+    def attach(self, state: ConnectionState) -> None:
+        """Start recording the events parsed by the given connection state."""
+        self._state = state
+        self._install()
+
+    def configure(self, *, path: Path | None, events: Iterable[str]) -> None:
+        self.path = path
+        self.events = frozenset(events)
+        self._install()
+
+    def record(self, event: str, data: Any) -> None:
+        path = self.path
+        if path is None:
+            return
+
+        line = json.dumps(
+            {"t": time.time(), "event": event, "data": self.anonymize(data)},
+            separators=(",", ":"),
+        )
+        self._writer.write(path, line)
+
+    def anonymize(self, data: Any, key: str = "") -> Any:
+        """Return a copy of a payload with identifying values replaced.
+
+        :param data: The payload to anonymize.
+        :param key: The key of the parent object that the payload belongs to.
+
+        """
+        if isinstance(data, dict):
+            return {k: self.anonymize(v, k) for k, v in data.items()}
+        elif isinstance(data, list):
+            return [self.anonymize(v, key) for v in data]
+        elif not isinstance(data, str):
+            return data
+        elif _SNOWFLAKE_PATTERN.fullmatch(data) and key not in _NUMERIC_KEYS:
+            return self._anonymize_id(data)
+        elif key in _KEPT_STRING_KEYS or data.isdigit():
+            return data
+        elif _TIMESTAMP_PATTERN.fullmatch(data):
+            return data
+        return "x" * len(data)
+
+    def _anonymize_id(self, snowflake: str) -> str:
+        state = self._state
+        if state is not None and snowflake == str(state.self_id):
+            return SELF_ID
+
+        digest = hmac.digest(self._key, snowflake.encode(), hashlib.sha256)
+        # Keep IDs within SQLite's signed 64-bit integers
+        return str(int.from_bytes(digest[:8]) >> 1)
+
+    def _install(self) -> None:
+        state = self._state
+        if state is None:
+            return
+
+        events = self.events if self.path is not None else frozenset()
+        for event in list(self._originals):
+            if event not in events:
+                state.parsers[event] = self._originals.pop(event)
+
+        for event in events - self._originals.keys():
+            parser = state.parsers.get(event)
+            if parser is None:
+                log.warning("Cannot record unknown gateway event %s", event)
+                continue
+
+            self._originals[event] = parser
+            state.parsers[event] = self._wrap(event, parser)
+
+    def _wrap(
+        self,
+        event: str,
+        parser: Callable[[Any], None],
+    ) -> Callable[[Any], None]:
+        def record_and_parse(data: Any) -> None:
+            try:
+                self.record(event, data)
+            except Exception:
+                log.exception("Failed to record %s event", event)
+            parser(data)
+
+        return record_and_parse
+
+
+RECORDER = EventRecorder()
+"""The recorder used for the bot's gateway events."""
+
+
+def configure_event_recorder(settings: SettingsEventRecorder) -> None:
+    """Apply the given settings to the global event recorder."""
+    path = Path(settings.file) if settings.file != "" else None
+    RECORDER.configure(path=path, events=settings.events)
@@ -0,0 +1,201 @@
+import builtins
+import hashlib
+import importlib.metadata
+import logging
+import marshal
+import os
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+import babel
+import babel.plural
+from fluent_compiler import compiler, runtime
+from fluent_compiler.builtins import BUILTINS
+from fluent_compiler.bundle import FluentBundle
+from fluent_compiler.resource import FtlResource
+
+from . import __version__
+from .appdirs import APP_DIRS
+
+log = logging.getLogger(__name__)
+
+CACHE_FORMAT = 1
+"""The version of the cache file format.
+
+This should be incremented whenever the structure of the cached data changes.
+
+"""
+
+
+def get_cache_path(locale: str) -> Path:
+    return APP_DIRS.user_cache_path / "fluent" / f"{locale}.marshal"
+
+
+def get_cache_key(locale: str, paths: list[Path]) -> str:
+    """Return a key identifying the compiled output of the given FTL files.
+
+    The key covers everything that can change the generated code,
+    including our version, the versions of fluent-compiler and Babel
+    (which provides plural rules), and the bytecode format of the
+    current interpreter.
+
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_FORMAT}\0{__version__}\0".encode())
+    for package in ("fluent-compiler", "babel"):
+        digest.update(f"{importlib.metadata.version(package)}\0".encode())
+    digest.update(f"\0{sys.implementation.cache_tag}\0{locale}\0".encode())
+
+    for path in sorted(paths):
+        digest.update(f"{path.name}\0".encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+
+    return digest.hexdigest()
+
+
+def load_bundle(locale: str, paths: list[Path]) -> FluentBundle:
+    """Load a bundle for the given locale and FTL files, using the on-disk
+    cache when possible.
+
+    Bundles loaded from the cache skip parsing, compilation, and
+    message checks, since only bundles without errors are ever cached.
+
+    :raises ValueError: The FTL files could not be compiled without errors.
+
+    """
+    key = get_cache_key(locale, paths)
+    cache_path = get_cache_path(locale)
+
+    bundle = _read_cached_bundle(cache_path, locale, key)
+    if bundle is not None:
+        log.debug("Loaded %s localizations from cache", locale)
+        return bundle
+
+    bundle, data = _compile_bundle(locale, paths)
+    data["key"] = key
+    _write_cached_bundle(cache_path, data)
+    return bundle
+
+
+def _compile_bundle(
+    locale: str,
+    paths: list[Path],
+) -> tuple[FluentBundle, dict[str, Any]]:
+    # This is a reimplementation of fluent_compiler's compile_messages()
+    # which keeps the compiled code objects around so they can be marshalled.
+    resources = [FtlResource.from_file(str(path)) for path in paths]
+    messages, errors = compiler._parse_resources(resources)
+
+    functions = BUILTINS.copy()
+    module, message_mapping, module_globals, compilation_errors = (
+        compiler.messages_to_module(
+            messages,
+            babel.Locale.parse(locale.replace("-", "_")),
+            functions=functions,
+        )
+    )
+    errors = errors + compilation_errors
+    if len(errors) > 0:
+        raise ValueError(f"Failed to parse {locale} localizations: {errors}")
+
+    code_objects = []
+    for module_ast in module.as_multiple_module_ast():
+        filename = getattr(module_ast.body[0], "filename", "<string>")
+        code_objects.append(compile(module_ast, filename, "exec"))
+
+    message_functions = {
+        str(message_id): function_name
+        for message_id, function_name in message_mapping.items()
+        if not message_id.startswith(compiler.TERM_SIGIL)
+    }
+    function_names = {
+        global_name: name
+        for name, func in functions.items()
+        for global_name, value in module_globals.items()
+        if value is func
+    }
+
+    data = {
+        "messages": message_functions,
+        "functions": function_names,
+        "code": code_objects,
+    }
+    bundle = _create_bundle(locale, data, module_globals)
+    return bundle, data
+
+
+def _create_bundle(
+    locale: str,
+    data: dict[str, Any],
+    module_globals: dict[str, Any],
+) -> FluentBundle:
+    for code in data["code"]:
+        exec(code, module_globals)
+
+    bundle = FluentBundle.__new__(FluentBundle)
+    bundle.locale = locale
+    bundle._compiled_messages = {
+        message_id: module_globals[function_name]
+        for message_id, function_name in data["messages"].items()
+    }
+    bundle._compilation_errors = []
+    return bundle
+
+
+def _create_module_globals(locale: str, data: dict[str, Any]) -> dict[str, Any]:
+    # Mirrors the globals set up by fluent_compiler's messages_to_module()
+    babel_locale = babel.Locale.parse(locale.replace("-", "_"))
+
+    module_globals = {name: getattr(runtime, name) for name in runtime.__all__}
+    module_globals.update(builtins.__dict__)
+    module_globals[compiler.LOCALE_NAME] = babel_locale
+    module_globals[compiler.PLURAL_FORM_FOR_NUMBER_NAME] = _create_plural_function(
+        babel_locale.plural_form,
+    )
+
+    for global_name, name in data["functions"].items():
+        module_globals[global_name] = BUILTINS[name]
+
+    return module_globals
+
+
+def _create_plural_function(plural_form: babel.plural.PluralRule) -> Callable:
+    plural_form_for_number_main = babel.plural.to_python(plural_form)
+
+    def plural_form_for_number(number):
+        try:
+            return plural_form_for_number_main(number)
+        except TypeError:
+            return None
+
+    return plural_form_for_number
+
+
+def _read_cached_bundle(path: Path, locale: str, key: str) -> FluentBundle | None:
+    try:
+        with path.open("rb") as f:
+            data = marshal.load(f)
+    except FileNotFoundError:
+        return
+    except (EOFError, OSError, TypeError, ValueError):
+        log.warning("Ignoring unreadable localization cache %s", path)
+        return
+
+    if not isinstance(data, dict) or data.get("key") != key:
+        return
+
+    module_globals = _create_module_globals(locale, data)
+    return _create_bundle(locale, data, module_globals)
+
+
+def _write_cached_bundle(path: Path, data: dict[str, Any]) -> None:
+    temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with temp_path.open("wb") as f:
+            marshal.dump(data, f)
+        os.replace(temp_path, path)
+    except OSError:
+        log.warning("Failed to write localization cache %s", path, exc_info=True)
+        temp_path.unlink(missing_ok=True)
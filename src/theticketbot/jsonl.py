@@ -0,0 +1,63 @@
+"""Append JSON lines to files without blocking the event loop."""
+
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+
+class JSONLWriter:
+    """Appends lines of JSON to files from a background thread.
+
+    Files are rotated to a ``.1`` suffix once they exceed the maximum size.
+
+    :param name: The name of the writer thread.
+    :param max_file_size: The size in bytes at which files are rotated.
+
+    """
+
+    def __init__(self, name: str, max_file_size: int) -> None:
+        self.name = name
+        self.max_file_size = max_file_size
+
+        self._queue: queue.SimpleQueue[tuple[Path, str]] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+
+    def write(self, path: Path, line: str) -> None:
+        """Queue a line to be appended to the given file."""
+        self._queue.put((path, line))
+        self._ensure_thread()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._write_forever,
+                    name=self.name,
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def _write_forever(self) -> None:
+        while True:
+            path, line = self._queue.get()
+            try:
+                self._write(path, line)
+            except OSError:
+                log.exception("Failed to write to %s", path)
+
+    def _write(self, path: Path, line: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            size = f.tell()
+
+        if size > self.max_file_size:
+            os.replace(path, path.with_name(path.name + ".1"))
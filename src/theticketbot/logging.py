@@ -1,13 +1,27 @@
+from __future__ import annotations
+
+import atexit
+import collections
+import copy
 import datetime
+import gzip
+import itertools
 import json
 import logging
 import logging.handlers
-from typing import Any
-
-import discord
+import math
+import os
+import queue
+import random
+import shutil
+import threading
+from typing import TYPE_CHECKING, Any, Callable
 
 from .appdirs import APP_DIRS
 
+if TYPE_CHECKING:
+    from .config import SettingsLogging
+
 LOG_RECORD_ATTRIBUTES = {
     "args",
     "asctime",
@@ -36,25 +50,38 @@ LOG_RECORD_ATTRIBUTES = {
 
 log = logging.getLogger(__package__)
 
+_flood_filter: FloodFilter | None = None
+
 
 class JSONFormatter(logging.Formatter):
+    """Formats log records as JSON objects, one per line.
+
+    Attributes added to records with ``extra=`` are included in the output.
+    If orjson is installed, it will be used to encode records.
+
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._encode = _get_json_encoder()
+        self._timestamp_cache = (-1, "")
+
     def format(self, record: logging.LogRecord) -> str:
         data = self._prepare_record(record)
-        return json.dumps(data, default=str)
+        return self._encode(data)
 
     def _prepare_record(self, record: logging.LogRecord) -> dict[str, Any]:
-        data = {}
+        record_vars = vars(record)
 
-        for k, v in vars(record).items():
-            if k not in LOG_RECORD_ATTRIBUTES:
-                data[k] = v
-
-        created = datetime.datetime.fromtimestamp(
-            record.created,
-            tz=datetime.timezone.utc,
-        )
+        # Most records have no extra attributes, so a set difference
+        # is cheaper than checking each attribute individually
+        extra = record_vars.keys() - LOG_RECORD_ATTRIBUTES
+        if extra:
+            data = {k: v for k, v in record_vars.items() if k in extra}
+        else:
+            data = {}
 
-        data["created"] = created.isoformat()
+        data["created"] = self._format_created(record.created)
         data["level"] = record.levelname
         data["name"] = record.name
         data["message"] = record.getMessage()
@@ -67,8 +94,293 @@ class JSONFormatter(logging.Formatter):
 
         return data
 
+    def _format_created(self, created: float) -> str:
+        # Equivalent to datetime.fromtimestamp(created, utc).isoformat(),
+        # but only formats the date and time once per second
+        fraction, whole = math.modf(created)
+        microseconds = round(fraction * 1e6)
+        if microseconds >= 1_000_000:
+            whole += 1
+            microseconds -= 1_000_000
+
+        second = int(whole)
+        cached_second, prefix = self._timestamp_cache
+        if second != cached_second:
+            dt = datetime.datetime.fromtimestamp(second, tz=datetime.timezone.utc)
+            prefix = dt.strftime("%Y-%m-%dT%H:%M:%S")
+            self._timestamp_cache = (second, prefix)
+
+        if microseconds == 0:
+            return f"{prefix}+00:00"
+        return f"{prefix}.{microseconds:06d}+00:00"
+
+
+def _get_json_encoder() -> Callable[[Any], str]:
+    # Match orjson's compact, non-ASCII-escaped output
+    json_encode = json.JSONEncoder(
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    ).encode
+    try:
+        import orjson
+    except ImportError:
+        return json_encode
+
+    def encode(data: Any) -> str:
+        try:
+            return orjson.dumps(data, default=str).decode()
+        except TypeError:
+            # orjson is stricter about keys and integer sizes
+            return json_encode(data)
+
+    return encode
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """A queue handler which preserves exception info for JSON logging.
+
+    The default implementation merges exceptions into the message
+    so records can be pickled, but our records never leave the process.
+
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge arguments now, in case they are mutated before the
+        # listener gets to them
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+class _FloodState:
+    __slots__ = ("count", "record", "suppressed", "window_start")
+
+    def __init__(self, record: logging.LogRecord) -> None:
+        self.count = 0
+        self.record = record
+        self.suppressed = 0
+        self.window_start = record.created
+
+
+class FloodFilter(logging.Filter):
+    """Suppresses repetitive log messages and samples noisy loggers.
+
+    Messages are grouped by their logger, level, and unformatted template,
+    so "Ignoring unknown guild %d" is treated as one message regardless
+    of the guild ID. Once more than ``burst`` messages in a group are logged
+    within ``window`` seconds, the rest are suppressed until the window ends,
+    after which a summary of the suppressed messages is emitted.
+
+    Records at ERROR level or above are never suppressed or sampled.
+
+    :param emit: The function used to emit summary records.
+    :param window: The number of seconds in each window.
+    :param burst: The number of messages allowed in each window.
+    :param sampling:
+        A mapping of logger names to the fraction of records to keep
+        from that logger and its children.
+
+    """
+
+    SWEEP_INTERVAL = 1.0
+
+    def __init__(
+        self,
+        emit: Callable[[logging.LogRecord], object],
+        *,
+        window: float = 60.0,
+        burst: int = 10,
+        sampling: dict[str, float] | None = None,
+    ) -> None:
+        super().__init__()
+        self.emit = emit
+        self.window = window
+        self.burst = burst
+        self.sampling = sampling or {}
+
+        self._lock = threading.Lock()
+        self._states: dict[tuple[str, int, str], _FloodState] = {}
+        self._sample_rates: dict[str, float] = {}
+        self._next_sweep = 0.0
+
+    def configure(
+        self,
+        *,
+        window: float,
+        burst: int,
+        sampling: dict[str, float],
+    ) -> None:
+        with self._lock:
+            self.window = window
+            self.burst = burst
+            self.sampling = sampling
+            self._sample_rates.clear()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or hasattr(record, "suppressed"):
+            return True
+
+        summaries: list[logging.LogRecord] = []
+        with self._lock:
+            if not self._sample(record.name):
+                return False
+
+            now = record.created
+            if now >= self._next_sweep:
+                summaries = self._sweep(now)
+                self._next_sweep = now + self.SWEEP_INTERVAL
+
+            key = (record.name, record.levelno, str(record.msg))
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _FloodState(record)
+
+            state.count += 1
+            allowed = state.count <= self.burst
+            if not allowed:
+                state.suppressed += 1
+
+        for summary in summaries:
+            self.emit(summary)
+
+        return allowed
+
+    def flush(self) -> None:
+        """Emit summaries for all messages suppressed so far."""
+        with self._lock:
+            summaries = self._sweep(float("inf"))
+
+        for summary in summaries:
+            self.emit(summary)
+
+    def _sample(self, name: str) -> bool:
+        rate = self._sample_rates.get(name)
+        if rate is None:
+            rate = self._sample_rates[name] = self._get_sample_rate(name)
+        return rate >= 1.0 or random.random() < rate
+
+    def _get_sample_rate(self, name: str) -> float:
+        while True:
+            rate = self.sampling.get(name)
+            if rate is not None:
+                return rate
+            elif "." not in name:
+                return 1.0
+            name = name.rpartition(".")[0]
+
+    def _sweep(self, now: float) -> list[logging.LogRecord]:
+        summaries: list[logging.LogRecord] = []
+        for key, state in list(self._states.items()):
+            if now - state.window_start < self.window:
+                continue
+
+            del self._states[key]
+            if state.suppressed > 0:
+                summaries.append(self._create_summary(state, now))
+
+        return summaries
+
+    def _create_summary(self, state: _FloodState, now: float) -> logging.LogRecord:
+        record = state.record
+        elapsed = min(now, state.window_start + self.window) - state.window_start
+        summary = logging.LogRecord(
+            record.name,
+            record.levelno,
+            record.pathname,
+            record.lineno,
+            "%d similar messages suppressed in the last %.0fs: %r",
+            (state.suppressed, elapsed, str(record.msg)),
+            None,
+            func=record.funcName,
+        )
+        summary.suppressed = state.suppressed
+        return summary
+
+
+def configure_log_filters(settings: SettingsLogging) -> None:
+    """Apply the given settings to the log filters created by
+    :func:`configure_logging()`.
+
+    If logging has not been configured, this does nothing.
+
+    """
+    if _flood_filter is None:
+        return
+
+    _flood_filter.configure(
+        window=settings.flood_window,
+        burst=settings.flood_burst,
+        sampling=settings.sampling,
+    )
+
+
+def _compress_log(source: str, dest: str) -> None:
+    temp = source + ".gz"
+    try:
+        with open(source, "rb") as f_in, gzip.open(temp, "wb") as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(temp, dest)
+        os.remove(source)
+    except OSError:
+        log.exception("Failed to compress rotated log file %s", source)
+
+
+class _LogCompressor:
+    """Compresses rotated log files one at a time in a background thread.
+
+    The thread exits once there are no more files to compress, and is
+    restarted by the next rotation.
+
+    """
+
+    def __init__(self) -> None:
+        self._pending: collections.deque[tuple[str, str]] = collections.deque()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._rotation_ids = itertools.count()
+
+    def rotate(self, source: str, dest: str) -> None:
+        # Rename synchronously so the handler can reopen its file immediately.
+        # Each rotation gets its own name so a rotation that happens before the
+        # last one was compressed can't overwrite it.
+        pending = f"{source}.{os.getpid()}-{next(self._rotation_ids)}"
+        os.replace(source, pending)
+
+        with self._lock:
+            self._pending.append((pending, dest))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="log-compressor",
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._pending) == 0:
+                    self._thread = None
+                    return
+                source, dest = self._pending.popleft()
+
+            _compress_log(source, dest)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+_gzip_rotator = _LogCompressor().rotate
+
 
 def configure_logging(verbose: int) -> None:
+    global _flood_filter
+
+    import discord
+
     root_level = logging.INFO
     if verbose > 0:
         log.setLevel(logging.DEBUG)
@@ -85,4 +397,29 @@ def configure_logging(verbose: int) -> None:
         encoding="utf-8",
     )
     handler.setFormatter(JSONFormatter())
-    logging.getLogger().addHandler(handler)
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+
+    # Move all handlers to a separate thread so the event loop
+    # only has to enqueue records
+    root = logging.getLogger()
+    handlers = [*root.handlers, handler]
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = LogQueueHandler(log_queue)
+    root.addHandler(queue_handler)
+
+    # Filtering floods before they're enqueued saves the most work
+    _flood_filter = FloodFilter(queue_handler.handle)
+    queue_handler.addFilter(_flood_filter)
+
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        *handlers,
+        respect_handler_level=True,
+    )
+    listener.start()
+    atexit.register(listener.stop)
+    atexit.register(_flood_filter.flush)
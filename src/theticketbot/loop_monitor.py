@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from . import metrics
+
+log = logging.getLogger(__name__)
+
+LOOP_LAG_SECONDS = metrics.histogram(
+    "theticketbot_loop_lag_seconds",
+    "Delay between when the event loop was scheduled to wake up and when it did.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+LOOP_BLOCKED = metrics.counter(
+    "theticketbot_loop_blocked_total",
+    "Number of times the event loop was blocked for longer than the threshold.",
+)
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports the stack of blocking calls.
+
+    A task running on the event loop sleeps for ``interval`` seconds at a time
+    and records how late it wakes up. Meanwhile, a watchdog thread checks
+    that the task keeps waking up, and if it hasn't for ``threshold`` seconds,
+    logs the stack of the event loop's thread while it is still blocked.
+
+    :param interval: The number of seconds between each lag measurement.
+    :param threshold:
+        The number of seconds the event loop can be blocked for
+        before its stack is logged.
+
+    """
+
+    def __init__(self, *, interval: float, threshold: float) -> None:
+        self.interval = interval
+        self.threshold = threshold
+
+        self._heartbeat = time.monotonic()
+        self._reported_heartbeat: float | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stop = threading.Event()
+        self._watchdog: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+
+        self._heartbeat = time.monotonic()
+        self._reported_heartbeat = None
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._measure_lag())
+
+        # Each watchdog gets its own event so a watchdog that hasn't
+        # exited yet can't be revived by starting again
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(self._stop,),
+            name="loop-monitor-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop monitoring and wait for the watchdog thread to exit."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        self._stop.set()
+        watchdog = self._watchdog
+        self._watchdog = None
+        if watchdog is not None:
+            # The watchdog may take up to one interval to notice
+            await asyncio.to_thread(watchdog.join)
+
+    async def _measure_lag(self) -> None:
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+
+            last_heartbeat = self._heartbeat
+            self._heartbeat = now
+            lag = max(now - start - self.interval, 0.0)
+            LOOP_LAG_SECONDS.observe(lag)
+
+            if lag < self.threshold:
+                continue
+            elif self._reported_heartbeat == last_heartbeat:
+                # The watchdog already logged this stall with its stack
+                log.debug("Event loop was blocked for %.3fs", lag)
+            else:
+                log.warning("Event loop was blocked for %.3fs", lag)
+
+    def _watch(self, stop: threading.Event) -> None:
+        while not stop.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.threshold or heartbeat == self._reported_heartbeat:
+                continue
+
+            # Only report each stall once
+            self._reported_heartbeat = heartbeat
+            LOOP_BLOCKED.inc()
+            self._report_blocked(blocked_for)
+
+    def _report_blocked(self, blocked_for: float) -> None:
+        if self._loop_thread_id is None:
+            return
+
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+
+        stack = "".join(traceback.format_stack(frame))
+        log.warning(
+            "Event loop has been blocked for at least %.3fs, current stack:\n%s",
+            blocked_for,
+            stack,
+        )
@@ -0,0 +1,318 @@
+"""Tools for inspecting the memory used by the bot's caches.
+
+Sizes are estimated by measuring the deep size of a sample of each
+cache's entries, so they are approximate. Objects shared between
+caches, like the users referenced by members, may be counted more than once.
+
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import sys
+import tracemalloc
+import types
+from collections.abc import Collection, Mapping
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Iterable, NamedTuple, Protocol
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+# Objects which reference (nearly) everything else, and shouldn't be
+# counted towards the size of the objects referencing them
+_OPAQUE_TYPES: tuple[type, ...] = (
+    asyncio.AbstractEventLoop,
+    type,
+    types.BuiltinFunctionType,
+    types.FunctionType,
+    types.MethodType,
+    types.ModuleType,
+)
+
+
+class CacheSize(NamedTuple):
+    name: str
+    entries: int
+    size: int
+    """The approximate size of the cache in bytes."""
+
+
+class CacheProvider(Protocol):
+    """An object, typically a cog, which holds in-memory caches."""
+
+    def get_caches(self) -> dict[str, Collection[Any]]:
+        """Return a mapping of cache names to their collections."""
+        ...
+
+
+def get_deep_size(obj: Any, seen: set[int] | None = None) -> int:
+    """Return the approximate size of an object and everything it references.
+
+    Classes, functions, modules, event loops, and discord.py's clients,
+    connection states, and guilds are not followed unless they are
+    the given object.
+
+    :param obj: The object to measure.
+    :param seen:
+        The IDs of objects that were already counted.
+        This set is updated with every object measured.
+
+    """
+    if seen is None:
+        seen = set()
+
+    opaque_types = _get_opaque_types()
+    size = 0
+    stack = [obj]
+    while len(stack) > 0:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        elif current is not obj and isinstance(current, opaque_types):
+            continue
+
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool)):
+            continue
+        elif isinstance(current, Mapping):
+            # Includes weak dictionaries, whose entries may be removed at any time
+            for key, value in list(current.items()):
+                stack.append(key)
+                stack.append(value)
+        elif isinstance(current, Collection):
+            stack.extend(current)
+
+        attributes = getattr(current, "__dict__", None)
+        if isinstance(attributes, dict):
+            stack.append(attributes)
+
+        for cls in type(current).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if isinstance(slot, str) and slot not in ("__dict__", "__weakref__"):
+                    value = getattr(current, _mangle(cls, slot), None)
+                    if value is not None:
+                        stack.append(value)
+
+    return size
+
+
+def estimate_size(
+    items: Iterable[Any],
+    count: int,
+    *,
+    sample_size: int = 100,
+) -> int:
+    """Estimate the total size of a number of items by measuring a sample.
+
+    :param items: The items to measure. Only the first items are sampled.
+    :param count: The total number of items.
+    :param sample_size: The number of items to measure.
+
+    """
+    if count == 0:
+        return 0
+
+    sample = list(itertools.islice(items, sample_size))
+    if len(sample) == 0:
+        return 0
+
+    seen: set[int] = set()
+    sample_total = sum(get_deep_size(item, seen) for item in sample)
+    return round(sample_total / len(sample) * count)
+
+
+async def get_cache_sizes(bot: Bot, *, sample_size: int = 100) -> list[CacheSize]:
+    """Return the entry counts and approximate sizes of discord.py's caches
+    and the caches of any cogs implementing :class:`CacheProvider`.
+
+    Caches are measured on the event loop since they may change at any time,
+    but control is yielded back to the loop after measuring each cache.
+
+    """
+    state = bot._connection
+    guilds = list(state._guilds.values())
+
+    measurements: list[Callable[[], CacheSize]] = [
+        partial(_measure, "discord.guilds", guilds, sample_size),
+        partial(_measure, "discord.users", list(state._users.values()), sample_size),
+        partial(_measure_nested, "discord.members", guilds, "_members", sample_size),
+        partial(_measure_nested, "discord.channels", guilds, "_channels", sample_size),
+        partial(_measure_nested, "discord.threads", guilds, "_threads", sample_size),
+        partial(_measure_nested, "discord.roles", guilds, "_roles", sample_size),
+        partial(_measure, "discord.emojis", list(state._emojis.values()), sample_size),
+        partial(_measure, "discord.messages", list(state._messages or ()), sample_size),
+        partial(
+            _measure,
+            "discord.views",
+            list(state._view_store._synced_message_views.values()),
+            sample_size,
+        ),
+    ]
+
+    for cog_name, cog in bot.cogs.items():
+        get_caches = getattr(cog, "get_caches", None)
+        if get_caches is None:
+            continue
+
+        for name, cache in get_caches().items():
+            values = list(cache.values() if isinstance(cache, dict) else cache)
+            measurements.append(
+                partial(_measure, f"{cog_name}.{name}", values, sample_size),
+            )
+
+    sizes: list[CacheSize] = []
+    for measure in measurements:
+        sizes.append(measure())
+        await asyncio.sleep(0)
+    return sizes
+
+
+def get_rss() -> int | None:
+    """Return the resident set size of this process in bytes,
+    or None if it cannot be determined on this platform.
+    """
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    import resource
+
+    return resident_pages * resource.getpagesize()
+
+
+class SnapshotDiff(NamedTuple):
+    location: str
+    size: int
+    size_diff: int
+    blocks: int
+    blocks_diff: int
+
+
+class MemoryTracer:
+    """Takes tracemalloc snapshots and compares them to the previous one.
+
+    Tracing memory allocations slows down the process and uses extra
+    memory, so it should only be enabled while investigating.
+
+    """
+
+    def __init__(self) -> None:
+        self._snapshot: tracemalloc.Snapshot | None = None
+
+    @property
+    def is_tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        tracemalloc.start(frames)
+        self._snapshot = None
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self._snapshot = None
+
+    def take_snapshot(self, n: int = 10) -> list[SnapshotDiff]:
+        """Take a snapshot and return the N locations whose allocations
+        changed the most since the last snapshot.
+
+        If this is the first snapshot, the largest locations are returned.
+
+        :raises RuntimeError: Memory allocations are not being traced.
+
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory allocations are not being traced")
+
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<unknown>"),
+            )
+        )
+        previous, self._snapshot = self._snapshot, snapshot
+
+        if previous is None:
+            return [
+                SnapshotDiff(
+                    location=_format_traceback(stat.traceback),
+                    size=stat.size,
+                    size_diff=stat.size,
+                    blocks=stat.count,
+                    blocks_diff=stat.count,
+                )
+                for stat in snapshot.statistics("lineno")[:n]
+            ]
+
+        return [
+            SnapshotDiff(
+                location=_format_traceback(stat.traceback),
+                size=stat.size,
+                size_diff=stat.size_diff,
+                blocks=stat.count,
+                blocks_diff=stat.count_diff,
+            )
+            for stat in snapshot.compare_to(previous, "lineno")[:n]
+        ]
+
+
+def _format_traceback(traceback: tracemalloc.Traceback) -> str:
+    frame = traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def _get_opaque_types() -> tuple[type, ...]:
+    import discord
+    import discord.http
+    import discord.state
+
+    return (
+        *_OPAQUE_TYPES,
+        discord.Client,
+        discord.Guild,
+        discord.http.HTTPClient,
+        discord.state.ConnectionState,
+    )
+
+
+def _mangle(cls: type, name: str) -> str:
+    if name.startswith("__") and not name.endswith("__"):
+        return f"_{cls.__name__.lstrip('_')}{name}"
+    return name
+
+
+def _measure(name: str, values: list[Any], sample_size: int) -> CacheSize:
+    sample = random.sample(values, min(sample_size, len(values)))
+    return CacheSize(
+        name=name,
+        entries=len(values),
+        size=estimate_size(sample, len(values), sample_size=sample_size),
+    )
+
+
+def _measure_nested(
+    name: str,
+    guilds: list[Any],
+    attribute: str,
+    sample_size: int,
+) -> CacheSize:
+    collections = [getattr(guild, attribute) for guild in guilds]
+    count = sum(map(len, collections))
+
+    # Sample from a random selection of guilds rather than all of them
+    sampled_guilds = random.sample(collections, min(sample_size, len(collections)))
+    values = itertools.chain.from_iterable(
+        itertools.islice(collection.values(), 10) for collection in sampled_guilds
+    )
+    return CacheSize(
+        name=name,
+        entries=count,
+        size=estimate_size(values, count, sample_size=sample_size),
+    )
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import bisect
+import contextlib
+import logging
+import math
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Iterator, Sequence, TypeVar
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+"""The default histogram buckets in seconds, matching Prometheus' defaults."""
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+"""The content type of the Prometheus text exposition format."""
+
+_NAME_PATTERN = re.compile(r"[a-zA-Z_:][a-zA-Z0-9_:]*")
+
+LabelValues = tuple[str, ...]
+
+
+class Metric(ABC):
+    """The base class for all metrics.
+
+    Metrics may have labels, which must all be given as keyword arguments
+    whenever the metric is updated.
+
+    """
+
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ) -> None:
+        if _NAME_PATTERN.fullmatch(name) is None:
+            raise ValueError(f"Invalid metric name: {name!r}")
+
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _get_label_values(self, labels: dict[str, str]) -> LabelValues:
+        if labels.keys() != set(self.label_names):
+            raise ValueError(
+                f"Expected labels {self.label_names} for {self.name}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _format_labels(self, values: LabelValues, **extra: str) -> str:
+        pairs = [*zip(self.label_names, values), *extra.items()]
+        if len(pairs) == 0:
+            return ""
+
+        labels = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in pairs)
+        return "{" + labels + "}"
+
+    @abstractmethod
+    def collect(self) -> Iterator[str]:
+        """Yield each sample of this metric in the Prometheus text format."""
+
+    def expose(self) -> Iterator[str]:
+        """Yield the lines describing this metric in the Prometheus text format."""
+        yield f"# HELP {self.name} {_escape_help(self.documentation)}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.collect()
+
+
+MetricT = TypeVar("MetricT", bound=Metric)
+
+
+class _ValueMetric(Metric):
+    """A metric storing a single number for each set of label values."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._values: dict[LabelValues, float] = {}
+        if len(self.label_names) == 0:
+            self._values[()] = 0
+
+    def _add(self, amount: float, labels: dict[str, str]) -> None:
+        key = self._get_label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._get_label_values(labels), 0)
+
+    def collect(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+
+        for key, value in values:
+            yield f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+
+
+class Counter(_ValueMetric):
+    """A value that only increases, such as the number of tickets created."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, /, **labels: str) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        self._add(amount, labels)
+
+
+class Gauge(_ValueMetric):
+    """A value that can increase and decrease, such as open connections."""
+
+    type = "gauge"
+
+    def inc(self, amount: float = 1, /, **labels: str) -> None:
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1, /, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, /, **labels: str) -> None:
+        key = self._get_label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "count", "sum")
+
+    def __init__(self, n_buckets: int) -> None:
+        self.buckets = [0] * n_buckets
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    """Counts observations in fixed buckets, such as request latencies.
+
+    :param buckets: The upper bounds of each bucket in ascending order.
+
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        if list(buckets) != sorted(buckets) or len(buckets) == 0:
+            raise ValueError("Buckets must be a non-empty ascending sequence")
+
+        self.buckets = tuple(buckets)
+        self._values: dict[LabelValues, _HistogramValue] = {}
+        if len(self.label_names) == 0:
+            self._values[()] = _HistogramValue(len(self.buckets))
+
+    def observe(self, value: float, /, **labels: str) -> None:
+        key = self._get_label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = _HistogramValue(len(self.buckets))
+
+            if index < len(self.buckets):
+                histogram.buckets[index] += 1
+            histogram.count += 1
+            histogram.sum += value
+
+    @contextlib.contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the number of seconds spent inside this context manager."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> Iterator[str]:
+        with self._lock:
+            values = [
+                (key, list(value.buckets), value.count, value.sum)
+                for key, value in self._values.items()
+            ]
+
+        for key, buckets, count, total in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                labels = self._format_labels(key, le=_format_value(bound))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+
+            labels = self._format_labels(key, le="+Inf")
+            yield f"{self.name}_bucket{labels} {count}"
+
+            labels = self._format_labels(key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """Stores metrics and exposes them in the Prometheus text format.
+
+    Metrics are created through the registry so that reloading an extension
+    returns the existing metric instead of resetting it.
+
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+    ) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram,
+            name,
+            documentation,
+            labels,
+            buckets=buckets,
+        )
+
+    def _get_or_create(
+        self,
+        cls: type[MetricT],
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        **kwargs,
+    ) -> MetricT:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(
+                    name,
+                    documentation,
+                    labels,
+                    **kwargs,
+                )
+            elif type(metric) is not cls or metric.label_names != tuple(labels):
+                raise ValueError(f"Metric {name} already registered differently")
+            return metric
+
+    def get(self, name: str) -> Metric | None:
+        return self._metrics.get(name)
+
+    def expose(self, prefix: str = "") -> str:
+        """Return all metrics in the Prometheus text exposition format.
+
+        :param prefix: If given, only metrics starting with this prefix are included.
+
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+
+        lines = [
+            line
+            for metric in metrics
+            if metric.name.startswith(prefix)
+            for line in metric.expose()
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(s: str) -> str:
+    return _escape_help(s).replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    elif value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+REGISTRY = MetricsRegistry()
+"""The registry used for all of theticketbot's metrics."""
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+class MetricsServer:
+    """Serves metrics over HTTP at ``/metrics``.
+
+    :param host: The host to bind to. This should usually be localhost.
+    :param port: The port to bind to.
+    :param registry: The registry to expose.
+
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        registry: MetricsRegistry = REGISTRY,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._runner: web.AppRunner | None = None
+
+    async def start(self) -> None:
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+
+        self._runner = runner
+        log.info("Serving metrics at http://%s:%d/metrics", self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        from aiohttp import web
+
+        return web.Response(
+            text=self.registry.expose(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
@@ -2,23 +2,100 @@ import importlib.resources
 import logging
 import re
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
+from importlib.resources.abc import Traversable
 from typing import Iterable, Iterator, NamedTuple, Self
 
 
 log = logging.getLogger(__name__)
 
+BACKFILL_SETTING_PREFIX = "migration-backfill-"
+
+SCHEMA_VERSION = 7
+"""The version of the latest migration script.
+
+This must be incremented with every new migration, so startup can skip
+discovering migrations when the database is already at this version.
+
+"""
+
 
 class Migration(NamedTuple):
     version: int
+    file: Traversable | None = None
+
+    def read_sql(self) -> str:
+        """Read the SQL script of this migration.
+
+        Files are only read on demand, so discovering migrations
+        doesn't touch the contents of each script.
+
+        """
+        if self.file is None:
+            return ""
+        return self.file.read_text("utf-8")
+
+
+class Backfill(NamedTuple):
+    """A migration which updates an existing table in committed batches.
+
+    Backfills are declared by starting a migration file with a header like::
+
+        -- theticketbot: backfill table=ticket batch_size=10000
+        UPDATE ticket SET ... WHERE rowid > :start AND rowid <= :end
+
+    The script must be a single idempotent statement using the ``:start``
+    and ``:end`` parameters to select a range of rowids.
+    Rather than running while migrating, backfills are registered in the
+    setting table and run in the background, committing after each batch
+    so progress can be resumed if the bot is stopped.
+
+    """
+
+    table: str
+    batch_size: int
     sql: str
 
+    _HEADER_PATTERN = re.compile(r"--\s*theticketbot:\s*backfill\b(.*)")
+    _OPTION_PATTERN = re.compile(r"(\w+)=(\S+)")
+    _TABLE_PATTERN = re.compile(r"[A-Za-z_]\w*")
+
+    @classmethod
+    def parse(cls, sql: str) -> Self | None:
+        """Parse a backfill from the given SQL script.
+
+        :returns: The backfill, or None if the script is a regular migration.
+        :raises ValueError: The backfill header is invalid.
+
+        """
+        header, _, body = sql.partition("\n")
+        m = cls._HEADER_PATTERN.fullmatch(header.strip())
+        if m is None:
+            return None
+
+        options = dict(cls._OPTION_PATTERN.findall(m[1]))
+        table = options.pop("table", "")
+        batch_size = options.pop("batch_size", "1000")
+        if options:
+            raise ValueError(f"Unknown backfill options: {', '.join(options)}")
+        elif cls._TABLE_PATTERN.fullmatch(table) is None:
+            raise ValueError(f"Invalid backfill table: {table!r}")
+        elif not batch_size.isdigit() or int(batch_size) < 1:
+            raise ValueError(f"Invalid backfill batch size: {batch_size!r}")
+
+        return cls(table=table, batch_size=int(batch_size), sql=body.strip())
+
 
 class Migrations(tuple[Migration, ...]):
     def after_version(self, version: int) -> Self:
         """Return a copy of self with only migrations after the given version."""
         return type(self)(m for m in self if m.version > version)
 
+    def get(self, version: int) -> Migration | None:
+        return next((m for m in self if m.version == version), None)
+
     def version_exists(self, version: int) -> bool:
         return any(m.version == version for m in self)
 
@@ -31,7 +108,13 @@ class MigrationFinder:
     _FILE_PATTERN = re.compile(r"(\d+)-(.+)\.sql")
 
     def discover(self) -> Migrations:
-        migrations: list[Migration] = [Migration(version=-1, sql="")]
+        """Find all migration scripts in the package.
+
+        :raises RuntimeError:
+            The latest migration doesn't match :data:`SCHEMA_VERSION`.
+
+        """
+        migrations: list[Migration] = [Migration(version=-1)]
 
         assert __package__ is not None
         path = importlib.resources.files(__package__).joinpath("migrations/")
@@ -45,8 +128,14 @@ class MigrationFinder:
                 continue
 
             version = int(m[1])
-            sql = file.read_text("utf-8")
-            migrations.append(Migration(version=version, sql=sql))
+            migrations.append(Migration(version=version, file=file))
+
+        latest = max(m.version for m in migrations)
+        if latest != SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Latest migration is v{latest:d}, but SCHEMA_VERSION "
+                f"is {SCHEMA_VERSION:d}",
+            )
 
         return Migrations.from_iterable_unsorted(migrations)
 
@@ -64,13 +153,33 @@ class Migrator:
             )
             return
 
+        pending = migrations.after_version(version)
+        if len(pending) == 0:
+            log.debug("Database is up to date")
+            return
+
         with self.begin() as conn:
-            for version, script in migrations.after_version(version):
-                log.info("Migrating database to v%d", version)
-                conn.executescript(script)
+            for migration in pending:
+                version = migration.version
+                sql = migration.read_sql()
+                backfill = Backfill.parse(sql)
+
+                if backfill is None:
+                    log.info("Migrating database to v%d", version)
+                    conn.executescript(sql)
+                else:
+                    log.info("Scheduling backfill for database v%d", version)
+                    self.schedule_backfill(version)
 
             conn.execute(f"PRAGMA user_version = {version:d}")
 
+    def schedule_backfill(self, version: int) -> None:
+        self.conn.execute(
+            "INSERT INTO setting (name, value) VALUES (?, 0) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            (f"{BACKFILL_SETTING_PREFIX}{version:d}",),
+        )
+
     def get_version(self) -> int:
         version = self.conn.execute("PRAGMA user_version").fetchone()[0]
         log.debug("PRAGMA user_version returned %d", version)
@@ -88,7 +197,233 @@ class Migrator:
             self.conn.commit()
 
 
+class Backfiller(Migrator):
+    """Runs pending backfills in batches, committing after each batch.
+
+    This is intended to run in a separate thread from the event loop.
+
+    :param conn: The connection to use.
+    :param stop:
+        An event which, when set, stops backfilling after the current batch.
+        Unfinished backfills are resumed the next time they are run.
+
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        stop: threading.Event | None = None,
+    ) -> None:
+        super().__init__(conn)
+        self.stop = stop or threading.Event()
+
+    def get_pending_backfills(self) -> dict[int, int]:
+        """Return a mapping of pending backfill versions to the last rowid
+        they backfilled, or 0 if they haven't started.
+        """
+        rows = self.conn.execute(
+            "SELECT name, value FROM setting WHERE name LIKE ?",
+            (f"{BACKFILL_SETTING_PREFIX}%",),
+        ).fetchall()
+
+        pending: dict[int, int] = {}
+        for name, value in rows:
+            version = name.removeprefix(BACKFILL_SETTING_PREFIX)
+            if version.isdigit():
+                pending[int(version)] = int(value)
+        return pending
+
+    def run_backfills(self, migrations: Migrations) -> None:
+        for version, start in sorted(self.get_pending_backfills().items()):
+            if self.stop.is_set():
+                return
+
+            migration = migrations.get(version)
+            backfill = None
+            if migration is not None:
+                backfill = Backfill.parse(migration.read_sql())
+            if backfill is None:
+                log.warning("Unrecognized backfill for v%d, skipping", version)
+                continue
+
+            self.run_backfill(version, backfill, start)
+
+    def run_backfill(self, version: int, backfill: Backfill, start: int) -> bool:
+        """Run a backfill starting after the given rowid.
+
+        Batches contain up to ``batch_size`` existing rows rather than
+        a fixed range of rowids, since tables keyed by snowflakes have
+        large gaps between their rowids.
+
+        :param start:
+            The last rowid that was backfilled, or 0 to start from
+            the beginning of the table.
+        :returns: True if the backfill was completed, False if it was stopped.
+
+        """
+        name = f"{BACKFILL_SETTING_PREFIX}{version:d}"
+        end_rowid = self._get_max_rowid(backfill.table)
+        if start != 0:
+            log.info("Resuming backfill for v%d from rowid %d", version, start)
+        else:
+            log.info("Running backfill for v%d", version)
+            start = self._get_min_rowid(backfill.table) - 1
+
+        while start < end_rowid:
+            if self.stop.is_set():
+                log.info("Stopped backfill for v%d at rowid %d", version, start)
+                return False
+
+            end = self._get_batch_end(backfill, start)
+            if end is None or end > end_rowid:
+                end = end_rowid
+
+            with self.begin() as conn:
+                conn.execute(backfill.sql, {"start": start, "end": end})
+                conn.execute("UPDATE setting SET value = ? WHERE name = ?", (end, name))
+            start = end
+
+        with self.begin() as conn:
+            conn.execute("DELETE FROM setting WHERE name = ?", (name,))
+
+        log.info("Completed backfill for v%d", version)
+        return True
+
+    def _get_batch_end(self, backfill: Backfill, start: int) -> int | None:
+        # Returns None if there are fewer than batch_size rows left
+        row = self.conn.execute(
+            f"SELECT rowid FROM {backfill.table} WHERE rowid > ? "
+            f"ORDER BY rowid LIMIT 1 OFFSET ?",
+            (start, backfill.batch_size - 1),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def _get_min_rowid(self, table: str) -> int:
+        row = self.conn.execute(f"SELECT min(rowid) FROM {table}").fetchone()
+        return row[0] or 0
+
+    def _get_max_rowid(self, table: str) -> int:
+        row = self.conn.execute(f"SELECT max(rowid) FROM {table}").fetchone()
+        return row[0] or 0
+
+
+class MigrationTiming(NamedTuple):
+    version: int
+    backfill: bool
+    duration: float
+    """The total time in seconds it took to run the migration."""
+    lock_time: float
+    """The longest time in seconds that the database was locked for writing.
+
+    For regular migrations, this is the same as the duration.
+    For backfills, this is the duration of the slowest batch.
+
+    """
+    size_delta: int
+    """The change in database size in bytes."""
+    batches: int = 1
+    """The number of transactions the migration was committed in."""
+
+
+class _TimedBackfiller(Backfiller):
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        super().__init__(conn)
+        self.lock_times: list[float] = []
+
+    @contextmanager
+    def begin(self) -> Iterator[sqlite3.Connection]:
+        start = time.perf_counter()
+        try:
+            with super().begin() as conn:
+                yield conn
+        finally:
+            self.lock_times.append(time.perf_counter() - start)
+
+
+class MigrationRehearsal(Migrator):
+    """Runs each pending migration separately and measures its cost.
+
+    Unlike :meth:`run_migrations()`, backfills are run to completion
+    immediately after being scheduled. This should only be used on
+    a copy of the database.
+
+    """
+
+    def rehearse(self, migrations: Migrations) -> list[MigrationTiming]:
+        """Run and time each migration after the current version.
+
+        :raises ValueError: The database version is not recognized.
+
+        """
+        version = self.get_version()
+        if version > 0 and not migrations.version_exists(version):
+            raise ValueError(f"Unrecognized database version {version:d}")
+
+        return [
+            self.rehearse_migration(migration)
+            for migration in migrations.after_version(version)
+        ]
+
+    def rehearse_migration(self, migration: Migration) -> MigrationTiming:
+        size = self.get_size()
+        start = time.perf_counter()
+        version = migration.version
+        sql = migration.read_sql()
+        backfill = Backfill.parse(sql)
+
+        if backfill is None:
+            log.info("Migrating database to v%d", version)
+            with self.begin() as conn:
+                conn.executescript(sql)
+                conn.execute(f"PRAGMA user_version = {version:d}")
+            duration = lock_time = time.perf_counter() - start
+            batches = 1
+        else:
+            with self.begin() as conn:
+                self.schedule_backfill(version)
+                conn.execute(f"PRAGMA user_version = {version:d}")
+
+            backfiller = _TimedBackfiller(self.conn)
+            backfiller.run_backfill(version, backfill, start=0)
+            duration = time.perf_counter() - start
+            lock_time = max(backfiller.lock_times, default=0.0)
+            # The last transaction only removes the backfill from the setting table
+            batches = len(backfiller.lock_times) - 1
+
+        return MigrationTiming(
+            version=version,
+            backfill=backfill is not None,
+            duration=duration,
+            lock_time=lock_time,
+            size_delta=self.get_size() - size,
+            batches=batches,
+        )
+
+    def get_size(self) -> int:
+        page_count = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+
 def run_default_migrations(conn: sqlite3.Connection) -> None:
-    migrations = MigrationFinder().discover()
     migrator = Migrator(conn)
+    if migrator.get_version() == SCHEMA_VERSION:
+        log.debug("Database is up to date")
+        return
+
+    migrations = MigrationFinder().discover()
     migrator.run_migrations(migrations)
+
+
+def run_default_backfills(
+    conn: sqlite3.Connection,
+    *,
+    stop: threading.Event | None = None,
+) -> None:
+    backfiller = Backfiller(conn, stop=stop)
+    if len(backfiller.get_pending_backfills()) == 0:
+        return
+
+    migrations = MigrationFinder().discover()
+    backfiller.run_backfills(migrations)
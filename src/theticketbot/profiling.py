@@ -0,0 +1,251 @@
+import collections
+import contextlib
+import datetime
+import json
+import logging
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Collection, Iterable, Iterator, NamedTuple
+
+log = logging.getLogger(__name__)
+
+_IMPORT_TIME_PATTERN = re.compile(r"import time:\s*(\d+) \|\s*(\d+) \|( *)(\S+)")
+
+
+class ImportTime(NamedTuple):
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+class Phase(NamedTuple):
+    name: str
+    start: float
+    duration: float
+
+
+def parse_import_times(lines: Iterable[str]) -> list[ImportTime]:
+    """Parse the output of ``python -X importtime``.
+
+    Lines that don't describe an import are ignored.
+
+    """
+    import_times: list[ImportTime] = []
+    for line in lines:
+        m = _IMPORT_TIME_PATTERN.match(line)
+        if m is None:
+            continue
+
+        import_times.append(
+            ImportTime(
+                module=m[4],
+                depth=len(m[3]) // 2,
+                self_us=int(m[1]),
+                cumulative_us=int(m[2]),
+            )
+        )
+    return import_times
+
+
+def measure_import_times(modules: Iterable[str]) -> list[ImportTime]:
+    """Measure the import time of each module in a fresh interpreter.
+
+    :raises subprocess.CalledProcessError:
+        The modules could not be imported.
+
+    """
+    code = "import importlib\n"
+    code += "".join(f"importlib.import_module({name!r})\n" for name in modules)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    return parse_import_times(result.stderr.splitlines())
+
+
+class StartupProfiler:
+    """Records the wall time of each phase during startup.
+
+    Phase start times are relative to the creation of the profiler.
+
+    """
+
+    def __init__(self) -> None:
+        self.created_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.phases: list[Phase] = []
+
+    def finish(self) -> None:
+        """Mark the end of startup.
+
+        Reports created afterwards measure their elapsed time up to this
+        point, excluding any work done while creating the report.
+
+        """
+        if self.finished_at is None:
+            self.finished_at = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            phase = Phase(name, start - self.created_at, end - start)
+            self.phases.append(phase)
+            log.debug("Startup phase %s took %.3fs", name, phase.duration)
+
+    def create_report(
+        self,
+        import_times: Iterable[ImportTime] = (),
+    ) -> dict[str, Any]:
+        finished_at = self.finished_at
+        if finished_at is None:
+            finished_at = time.perf_counter()
+
+        return {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "elapsed": finished_at - self.created_at,
+            "phases": [phase._asdict() for phase in self.phases],
+            "imports": [
+                import_time._asdict()
+                for import_time in sorted(
+                    import_times,
+                    key=lambda import_time: import_time.self_us,
+                    reverse=True,
+                )
+            ],
+        }
+
+    def dump_report(
+        self,
+        directory: Path,
+        import_times: Iterable[ImportTime] = (),
+    ) -> Path:
+        """Write a JSON report of the startup phases to the given directory.
+
+        :returns: The path of the written report.
+
+        """
+        now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = directory / f"startup-profile-{now}.json"
+
+        report = self.create_report(import_times)
+        directory.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+
+        return path
+
+
+class SamplingProfiler:
+    """Periodically samples the call stacks of running threads.
+
+    Samples are aggregated as collapsed stacks, the format read by
+    flame graph tools like ``flamegraph.pl`` and speedscope.
+
+    :param interval: The number of seconds between each sample.
+    :param thread_ids:
+        The IDs of the threads to sample.
+        If None, all threads except the profiler's are sampled.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.005,
+        thread_ids: Collection[int] | None = None,
+    ) -> None:
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.samples = 0
+        self.duration = 0.0
+
+        self._frame_labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+
+    def run(self, duration: float) -> None:
+        """Sample stacks for the given number of seconds, blocking the
+        current thread until finished or :meth:`stop()` is called.
+        """
+        self._stop.clear()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own_id = threading.get_ident()
+
+        start = time.perf_counter()
+        deadline = start + duration
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                elif self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+
+                thread_name = thread_names.get(thread_id, str(thread_id))
+                self.stacks[self._collapse(thread_name, frame)] += 1
+
+            self.samples += 1
+            if time.perf_counter() >= deadline:
+                break
+
+        self.duration += time.perf_counter() - start
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def get_top_frames(self, n: int) -> list[tuple[str, int]]:
+        """Return the N frames which were most often at the top of the stack."""
+        leaves: collections.Counter[str] = collections.Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rpartition(";")[2]] += count
+        return leaves.most_common(n)
+
+    def dump_collapsed(self, directory: Path) -> Path:
+        """Write the sampled stacks in the collapsed stack format
+        to the given directory.
+
+        :returns: The path of the written file.
+
+        """
+        now = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = directory / f"profile-{now}.folded"
+
+        directory.mkdir(parents=True, exist_ok=True)
+        with path.open("w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        return path
+
+    def _collapse(self, thread_name: str, frame: FrameType | None) -> str:
+        labels: list[str] = []
+        while frame is not None:
+            labels.append(self._get_frame_label(frame.f_code))
+            frame = frame.f_back
+
+        labels.append(thread_name)
+        labels.reverse()
+        return ";".join(labels)
+
+    def _get_frame_label(self, code: CodeType) -> str:
+        label = self._frame_labels.get(code)
+        if label is None:
+            path = Path(code.co_filename)
+            filename = "/".join(path.parts[-2:])
+            label = f"{code.co_qualname} ({filename}:{code.co_firstlineno})"
+            # Semicolons separate frames in the collapsed format
+            label = label.replace(";", ":")
+            self._frame_labels[code] = label
+        return label
@@ -0,0 +1,237 @@
+import asyncio
+import functools
+import logging
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Callable, Literal, TypeVar
+
+import asqlite
+
+from . import metrics
+
+T = TypeVar("T")
+
+log = logging.getLogger(__name__)
+
+QUERY_SECONDS = metrics.histogram(
+    "theticketbot_db_query_seconds",
+    "Time spent executing SQL statements in the database worker thread.",
+)
+QUERY_WAIT_SECONDS = metrics.histogram(
+    "theticketbot_db_query_wait_seconds",
+    "Time SQL statements spent queued before being executed.",
+)
+
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_PATTERN = re.compile(
+    r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)",
+    re.IGNORECASE,
+)
+
+_EXECUTE_METHODS = frozenset({"execute", "executemany", "executescript"})
+_FETCH_METHODS = frozenset({"fetchone", "fetchmany", "fetchall"})
+
+QuerySortKey = Literal["total", "mean", "max", "calls", "wait"]
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Normalize an SQL statement so similar statements can be grouped.
+
+    Whitespace is collapsed, literals are replaced with ``?``, and lists
+    of placeholders like ``IN (?, ?, ?)`` are collapsed into ``(?, ...)``.
+
+    """
+    sql = _STRING_PATTERN.sub("?", sql)
+    sql = _NUMBER_PATTERN.sub("?", sql)
+    sql = _WHITESPACE_PATTERN.sub(" ", sql).strip()
+    sql = _PLACEHOLDER_LIST_PATTERN.sub("IN (?, ...)", sql)
+    return sql
+
+
+def redact_parameters(parameters: Any) -> str:
+    """Describe the given query parameters without revealing their values."""
+    if parameters is None:
+        return "()"
+    elif isinstance(parameters, dict):
+        types = ", ".join(
+            f"{name}: {type(value).__name__}" for name, value in parameters.items()
+        )
+        return "{" + types + "}"
+    elif isinstance(parameters, (tuple, list)):
+        if len(parameters) > 0 and isinstance(parameters[0], (dict, tuple, list)):
+            return f"<{len(parameters)} rows>"
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    elif hasattr(parameters, "__len__"):
+        return f"<{len(parameters)} rows>"
+    return f"<{type(parameters).__name__}>"
+
+
+class QueryStats:
+    """Aggregated timings for a normalized SQL statement."""
+
+    __slots__ = ("sql", "calls", "total_time", "max_time", "total_wait")
+
+    def __init__(self, sql: str) -> None:
+        self.sql = sql
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.total_wait = 0.0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.calls if self.calls > 0 else 0.0
+
+    def get_sort_key(self, key: QuerySortKey) -> float:
+        if key == "total":
+            return self.total_time
+        elif key == "mean":
+            return self.mean_time
+        elif key == "max":
+            return self.max_time
+        elif key == "calls":
+            return self.calls
+        elif key == "wait":
+            return self.total_wait
+        raise ValueError(f"Unknown sort key: {key!r}")
+
+
+class QueryRecorder:
+    """Aggregates query timings by their normalized SQL.
+
+    Execution time includes any rows fetched afterwards through the same
+    cursor, while wait time measures how long each statement was queued
+    in the connection's worker thread.
+
+    :param slow_query_threshold:
+        The number of seconds a statement can take before it is logged
+        as a slow query. Set to 0 to disable the slow query log.
+
+    """
+
+    def __init__(self, *, slow_query_threshold: float = 0.0) -> None:
+        self.slow_query_threshold = slow_query_threshold
+        self._stats: dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        sql: str,
+        parameters: Any,
+        *,
+        wait: float,
+        duration: float,
+        is_fetch: bool = False,
+    ) -> None:
+        normalized = normalize_sql(sql)
+        with self._lock:
+            stats = self._stats.get(normalized)
+            if stats is None:
+                stats = self._stats[normalized] = QueryStats(normalized)
+
+            if not is_fetch:
+                stats.calls += 1
+            stats.total_time += duration
+            stats.max_time = max(stats.max_time, duration)
+            stats.total_wait += wait
+
+        QUERY_SECONDS.observe(duration)
+        QUERY_WAIT_SECONDS.observe(wait)
+
+        threshold = self.slow_query_threshold
+        if threshold > 0 and duration >= threshold:
+            log.warning(
+                "Slow query took %.3fs after waiting %.3fs: %s %s",
+                duration,
+                wait,
+                normalized,
+                redact_parameters(parameters),
+            )
+
+    def get_top(self, n: int, key: QuerySortKey = "total") -> list[QueryStats]:
+        """Return the top N statements sorted by the given key."""
+        with self._lock:
+            stats = list(self._stats.values())
+
+        stats.sort(key=lambda stat: stat.get_sort_key(key), reverse=True)
+        return stats[:n]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+RECORDER = QueryRecorder()
+"""The recorder used for all database connections."""
+
+
+class TimedWorker(asqlite._Worker):
+    """An asqlite worker thread which records the timing of each statement.
+
+    This is a reimplementation of asqlite's worker which wraps each posted
+    function so queue wait and execution time can be measured separately.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        loop: asyncio.AbstractEventLoop,
+        recorder: QueryRecorder = RECORDER,
+    ) -> None:
+        super().__init__(loop=loop)
+        self.recorder = recorder
+        self._cursor_sql: weakref.WeakKeyDictionary[sqlite3.Cursor, str] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def post(
+        self,
+        func: Callable[..., T],
+        *args: Any,
+        **kwargs: Any,
+    ) -> asyncio.Future[T]:
+        name = getattr(func, "__name__", "")
+        sql: str | None = None
+        parameters: Any = None
+        is_fetch = False
+
+        if name in _EXECUTE_METHODS and len(args) > 0 and isinstance(args[0], str):
+            sql = args[0]
+            parameters = args[1] if len(args) > 1 else None
+        elif name in _FETCH_METHODS:
+            cursor = getattr(func, "__self__", None)
+            sql = self._cursor_sql.get(cursor) if cursor is not None else None
+            is_fetch = True
+
+        if sql is None:
+            return super().post(func, *args, **kwargs)
+
+        query = sql
+        enqueued_at = time.perf_counter()
+
+        def timed(*args: Any, **kwargs: Any) -> T:
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                self.recorder.record(
+                    query,
+                    parameters,
+                    wait=start - enqueued_at,
+                    duration=end - start,
+                    is_fetch=is_fetch,
+                )
+
+            if isinstance(result, sqlite3.Cursor):
+                self._cursor_sql[result] = query
+            return result
+
+        return super().post(timed, *args, **kwargs)
@@ -0,0 +1,192 @@
+"""A minimal in-process tracing API for measuring where time is spent.
+
+Spans are created with the :func:`span()` context manager, and spans
+created inside another span become its children::
+
+    with tracing.span("create-ticket", guild_id=guild.id):
+        with tracing.span("create-thread"):
+            ...
+
+When the outermost span of a trace finishes, the trace is recorded
+by the :data:`TRACER`.
+
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator
+
+from .jsonl import JSONLWriter
+
+if TYPE_CHECKING:
+    from .config import SettingsTracing
+
+log = logging.getLogger(__name__)
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "_current_span",
+    default=None,
+)
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = (
+        "attributes",
+        "children",
+        "created_at",
+        "duration",
+        "error",
+        "name",
+        "parent",
+        "start",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Span | None,
+        attributes: dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.children: list[Span] = []
+        self.created_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: float | None = None
+        self.error: str | None = None
+
+    @property
+    def root(self) -> Span:
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def walk(self, depth: int = 0) -> Iterator[tuple[int, Span]]:
+        """Yield this span and all of its descendants with their depth."""
+        yield depth, self
+        for child in self.children:
+            yield from child.walk(depth + 1)
+
+    def to_dict(self) -> dict[str, Any]:
+        root_start = self.root.start
+        return {
+            "name": self.name,
+            "created": datetime.datetime.fromtimestamp(
+                self.created_at,
+                tz=datetime.timezone.utc,
+            ).isoformat(),
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+            "spans": [
+                {
+                    "name": span.name,
+                    "depth": depth,
+                    "offset": span.start - root_start,
+                    "duration": span.duration,
+                    "attributes": span.attributes,
+                    "error": span.error,
+                }
+                for depth, span in self.walk()
+                if span is not self
+            ],
+        }
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Time the code inside this context manager as a span.
+
+    If an exception is raised, its type is recorded as the span's error.
+
+    :param name: The name of the span.
+    :param attributes: Any attributes to attach to the span.
+
+    """
+    parent = _current_span.get()
+    current = Span(name, parent, attributes)
+    if parent is not None:
+        parent.children.append(current)
+
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.start
+        _current_span.reset(token)
+        if parent is None:
+            TRACER.record(current)
+
+
+class Tracer:
+    """Stores recently finished traces in memory and optionally on disk.
+
+    :param buffer_size: The number of recent traces to keep in memory.
+    :param path: If given, the JSONL file to append traces to.
+
+    """
+
+    MAX_FILE_SIZE = 5_000_000
+
+    def __init__(self, buffer_size: int = 100, path: Path | None = None) -> None:
+        self.traces: collections.deque[Span] = collections.deque(maxlen=buffer_size)
+        self.path = path
+        self._writer = JSONLWriter("trace-writer", self.MAX_FILE_SIZE)
+
+    def configure(self, *, buffer_size: int, path: Path | None) -> None:
+        if buffer_size != self.traces.maxlen:
+            self.traces = collections.deque(self.traces, maxlen=buffer_size)
+        self.path = path
+
+    def record(self, trace: Span) -> None:
+        self.traces.append(trace)
+
+        path = self.path
+        if path is not None:
+            # Serialize now, but write the file in a separate thread
+            line = json.dumps(trace.to_dict(), default=str)
+            self._writer.write(path, line)
+
+    def get_slowest(self, n: int, name: str | None = None) -> list[Span]:
+        """Return the N slowest recent traces, optionally filtered by name."""
+        traces = [trace for trace in self.traces if name is None or trace.name == name]
+        traces.sort(key=lambda trace: trace.duration or 0.0, reverse=True)
+        return traces[:n]
+
+
+TRACER = Tracer()
+"""The tracer used for all traces."""
+
+
+def format_trace(trace: Span) -> str:
+    """Format a trace and its spans as an indented tree of durations."""
+    lines = []
+    for depth, span in trace.walk():
+        duration = f"{span.duration * 1000:.1f}ms" if span.duration else "?"
+        offset = (span.start - trace.start) * 1000
+        line = f"{'  ' * depth}{span.name} {duration} (+{offset:.1f}ms)"
+        if span.error is not None:
+            line += f" [{span.error}]"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def configure_tracing(settings: SettingsTracing) -> None:
+    """Apply the given settings to the global tracer."""
+    path = Path(settings.file) if settings.file != "" else None
+    TRACER.configure(buffer_size=settings.buffer_size, path=path)
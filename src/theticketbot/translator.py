@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import functools
 import importlib.resources
+import logging
+import threading
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Iterator
+from typing import TYPE_CHECKING, Any, Hashable, Iterable, Iterator
 
 import discord
 from discord import app_commands
@@ -11,9 +15,13 @@ from discord.ext import commands
 from fluent_compiler.bundle import FluentBundle
 from fluent_compiler.errors import FluentReferenceError
 
+from .fluent_cache import load_bundle
+
 if TYPE_CHECKING:
     from .bot import Bot
 
+log = logging.getLogger(__name__)
+
 assert __package__ is not None
 _LOCALES_PATH = Path(str(importlib.resources.files(__package__).joinpath("locales")))
 
@@ -26,23 +34,152 @@ def yield_ftl_paths() -> Iterator[tuple[str, list[Path]]]:
         yield locale.name, list(locale.glob("*.ftl"))
 
 
+def freeze_data(data: Any) -> Hashable:
+    """Convert translation data into a hashable form.
+
+    :returns: The frozen data, or :data:`NotImplemented` if the data cannot be frozen.
+
+    """
+    if data is None:
+        return None
+    elif not isinstance(data, dict):
+        return NotImplemented
+
+    try:
+        # Values are paired with their types since 1, 1.0, and True are
+        # equal but can be formatted differently
+        frozen = tuple(sorted((k, type(v), v) for k, v in data.items()))
+        hash(frozen)
+    except TypeError:
+        return NotImplemented
+    return frozen
+
+
+def thaw_data(frozen: Hashable) -> dict[str, Any] | None:
+    """Convert data returned by :func:`freeze_data()` back into a dictionary."""
+    if frozen is None:
+        return None
+    assert isinstance(frozen, tuple)
+    return {k: v for k, _, v in frozen}
+
+
 class FluentBackend:
+    """Provides translations from the Fluent files in ``locales/``.
+
+    Bundles are compiled on first use of each locale, except for the
+    en-US fallback which is loaded upfront. Use :meth:`check_bundles()`
+    to find broken localizations without waiting for them to be used.
+    If a locale fails to load anyway, it is logged and the locale is
+    treated as untranslated, falling back to en-US.
+
+    Translations without data or with hashable data are memoized until
+    the bundles are reloaded.
+
+    """
+
+    CACHE_SIZE = 4096
+    FALLBACK_LOCALE = discord.Locale("en-US")
+    LOCALE_ALIASES = {discord.Locale("en-GB"): discord.Locale("en-US")}
+
+    version: int
+    """Incremented every time the bundles are reloaded."""
+
     def __init__(self) -> None:
-        ftl_paths = list(yield_ftl_paths())
-        ftl_paths = [(locale.replace("_", "-"), paths) for locale, paths in ftl_paths]
-        self.bundles = {
-            discord.Locale(locale): FluentBundle.from_files(
-                locale, list(map(str, paths))
-            )
-            for locale, paths in ftl_paths
-        }
+        self.bundles: dict[discord.Locale, FluentBundle] = {}
+        self.version = 0
+        self._failed_locales: set[discord.Locale] = set()
+        self._load_lock = threading.Lock()
+        self._format_cached = functools.lru_cache(self.CACHE_SIZE)(self._format_frozen)
+
+        self.reload()
+
+    def reload(self) -> None:
+        """Discard all loaded bundles and cached translations."""
+        with self._load_lock:
+            self.paths = {
+                discord.Locale(locale.replace("_", "-")): paths
+                for locale, paths in yield_ftl_paths()
+            }
+            self.bundles = {}
+            self._failed_locales = set()
+            # Translations already being formatted may still cache results
+            # from the old bundles, but under the previous version
+            self.version += 1
+            self._format_cached.cache_clear()
+
+        self.load_bundle(self.FALLBACK_LOCALE)
+
+    def check_bundles(self) -> None:
+        """Compile the bundle of every locale without keeping them loaded.
+
+        Bundles are usually read from the on-disk cache, so this is
+        much cheaper than compiling each locale from scratch.
+
+        :raises ValueError: One or more locales could not be compiled.
+
+        """
+        errors = []
+        for locale, paths in self.paths.items():
+            try:
+                load_bundle(locale.value, paths)
+            except ValueError as e:
+                errors.append(str(e))
+
+        if len(errors) > 0:
+            raise ValueError("\n".join(errors))
+
+    def load_bundle(self, locale: discord.Locale) -> FluentBundle | None:
+        """Return the bundle for the given locale, compiling it if needed.
 
-        for locale, bundle in self.bundles.items():
-            errors = bundle.check_messages()
-            if len(errors) > 0:
-                raise ValueError(f"Failed to parse {locale} localizations: {errors}")
+        :returns:
+            The bundle, or None if the locale has no localizations
+            or its localizations failed to compile.
+        :raises ValueError: The en-US fallback localizations failed to compile.
 
-        self.bundles[discord.Locale("en-GB")] = self.bundles[discord.Locale("en-US")]
+        """
+        locale = self.LOCALE_ALIASES.get(locale, locale)
+        bundle = self.bundles.get(locale)
+        if bundle is not None or locale not in self.paths:
+            return bundle
+        elif locale in self._failed_locales:
+            return None
+
+        with self._load_lock:
+            bundle = self.bundles.get(locale)
+            if bundle is None and locale not in self._failed_locales:
+                log.debug("Loading %s localizations", locale)
+                try:
+                    bundle = load_bundle(locale.value, self.paths[locale])
+                except ValueError:
+                    if locale == self.FALLBACK_LOCALE:
+                        raise
+
+                    log.exception(
+                        "Failed to load %s localizations, falling back to %s",
+                        locale,
+                        self.FALLBACK_LOCALE,
+                    )
+                    self._failed_locales.add(locale)
+                else:
+                    self.bundles[locale] = bundle
+
+        return bundle
+
+    async def load_bundle_async(self, locale: discord.Locale) -> FluentBundle | None:
+        """Return the bundle for the given locale, compiling it in a separate
+        thread if needed.
+
+        :returns: The bundle, or None if the locale has no localizations.
+
+        """
+        locale = self.LOCALE_ALIASES.get(locale, locale)
+        bundle = self.bundles.get(locale)
+        if bundle is not None or locale not in self.paths:
+            return bundle
+        elif locale in self._failed_locales:
+            return None
+
+        return await asyncio.to_thread(self.load_bundle, locale)
 
     def translate(
         self,
@@ -52,18 +189,50 @@ class FluentBackend:
         *,
         ignore_missing_data: bool = False,
     ) -> str | None:
-        bundle = self.bundles.get(locale)
+        message_id = string.extras.get("id", string.message)
+
+        frozen = freeze_data(data)
+        if frozen is not NotImplemented:
+            return self._format_cached(
+                message_id,
+                locale,
+                frozen,
+                ignore_missing_data,
+                self.version,
+            )
+
+        return self._format(message_id, locale, data, ignore_missing_data)
+
+    def _format_frozen(
+        self,
+        message_id: str,
+        locale: discord.Locale,
+        frozen: Hashable,
+        ignore_missing_data: bool,
+        version: int,
+    ) -> str | None:
+        # The version is only part of the cache key
+        data = thaw_data(frozen)
+        return self._format(message_id, locale, data, ignore_missing_data)
+
+    def _format(
+        self,
+        message_id: str,
+        locale: discord.Locale,
+        data: Any,
+        ignore_missing_data: bool,
+    ) -> str | None:
+        bundle = self.load_bundle(locale)
         if bundle is None:
             return
 
-        message_id = string.extras.get("id", string.message)
         translated, errors = bundle.format(message_id, data)
 
         if ignore_missing_data:
             errors = [e for e in errors if not isinstance(e, FluentReferenceError)]
 
         if len(errors) > 0:
-            raise ValueError(f"Failed to translate {string!r}: {errors}")
+            raise ValueError(f"Failed to translate {message_id!r}: {errors}")
 
         return translated or None
 
@@ -83,6 +252,7 @@ class FluentTranslator(app_commands.Translator):
         else:
             data = context.data
 
+        await fluent.load_bundle_async(locale)
         return fluent.translate(string, locale, data)
 
 
@@ -145,3 +315,39 @@ async def translate(
         )
 
     return translated or str(message)
+
+
+async def translate_many(
+    messages: Iterable[_locale_str | tuple[_locale_str, Any]],
+    obj: Bot | discord.Interaction,
+    *,
+    locale: discord.Locale | None = None,
+    data: Any = None,
+) -> list[str]:
+    """A shorthand for translating several messages into the same locale.
+
+    Messages can be paired with their own data as ``(message, data)`` tuples,
+    otherwise the given data is used.
+
+    Like :func:`translate()`, this will use the original message
+    if a translation could not be found.
+
+    """
+    if locale is None:
+        if isinstance(obj, commands.Bot):
+            locale = discord.Locale("en-US")
+        else:
+            locale = obj.locale
+
+    await fluent.load_bundle_async(locale)
+
+    translated: list[str] = []
+    for message in messages:
+        message_data = data
+        if isinstance(message, tuple):
+            message, message_data = message
+
+        content = fluent.translate(message, locale, message_data)
+        translated.append(content or str(message))
+
+    return translated
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import Any, Sequence, TypeVar
+
+import discord
+from discord import app_commands
+from discord.abc import Snowflake
+
+from .translator import fluent
+
+ClientT = TypeVar("ClientT", bound=discord.Client, covariant=True)
+
+log = logging.getLogger(__name__)
+
+AnyCommand = app_commands.Command | app_commands.Group | app_commands.ContextMenu
+
+
+def hash_payload(payload: list[dict[str, Any]]) -> str:
+    """Return a canonical SHA-256 hash of an application command payload.
+
+    Commands are sorted by type and name, so the hash doesn't depend on
+    the order that commands were added to the tree.
+
+    """
+    payload = sorted(payload, key=lambda command: (command["type"], command["name"]))
+    data = json.dumps(
+        payload,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        sort_keys=True,
+    )
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class _SyncPayload:
+    def __init__(
+        self,
+        commands: Sequence[AnyCommand],
+        translator: app_commands.Translator | None,
+        version: int,
+        payload: list[dict[str, Any]],
+    ) -> None:
+        self.commands = commands
+        self.translator = translator
+        self.version = version
+        self.payload = payload
+
+    def is_valid_for(
+        self,
+        commands: Sequence[AnyCommand],
+        translator: app_commands.Translator | None,
+        version: int,
+    ) -> bool:
+        # Commands are compared by identity, and strong references are kept
+        # so their IDs can't be reused by newly loaded commands.
+        return (
+            self.version == version
+            and self.translator is translator
+            and len(self.commands) == len(commands)
+            and all(a is b for a, b in zip(self.commands, commands))
+        )
+
+
+class CommandTree(app_commands.CommandTree[ClientT]):
+    """A command tree which caches the translated payloads used for syncing.
+
+    Payloads are recomputed whenever commands are added or removed,
+    the translator is changed, or the localizations are reloaded.
+    If a command is modified in place, :meth:`clear_sync_payloads()`
+    must be called for the change to be synced.
+
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._sync_payloads: dict[int | None, _SyncPayload] = {}
+
+    def clear_sync_payloads(self) -> None:
+        """Discard all cached sync payloads."""
+        self._sync_payloads.clear()
+
+    async def get_sync_payload(
+        self,
+        *,
+        guild: Snowflake | None = None,
+    ) -> list[dict[str, Any]]:
+        """Return the translated payload that would be sent when syncing.
+
+        The returned payload is cached and must not be modified.
+
+        :param guild:
+            The guild to get the payload for, or None for global commands.
+
+        """
+        guild_id = guild.id if guild is not None else None
+        commands = self._get_all_commands(guild=guild)
+        translator = self.translator
+        version = fluent.version
+
+        cached = self._sync_payloads.get(guild_id)
+        if cached is not None and cached.is_valid_for(commands, translator, version):
+            return cached.payload
+
+        if translator is not None:
+            payload = [
+                await command.get_translated_payload(self, translator)
+                for command in commands
+            ]
+        else:
+            payload = [command.to_dict(self) for command in commands]
+
+        log.debug("Computed sync payload for %d commands", len(payload))
+        self._sync_payloads[guild_id] = _SyncPayload(
+            commands,
+            translator,
+            version,
+            payload,
+        )
+        return payload
+
+    async def get_sync_hash(self, *, guild: Snowflake | None = None) -> str:
+        """Return a hash of the payload that would be sent when syncing.
+
+        This can be compared with the hash of a previous sync to determine
+        if the application commands have changed, including their localizations.
+
+        :param guild:
+            The guild to get the hash for, or None for global commands.
+
+        """
+        payload = await self.get_sync_payload(guild=guild)
+        return hash_payload(payload)
+
+    async def sync(
+        self,
+        *,
+        guild: Snowflake | None = None,
+    ) -> list[app_commands.AppCommand]:
+        # This is a reimplementation of CommandTree.sync() using cached payloads
+        application_id = self.client.application_id
+        if application_id is None:
+            raise app_commands.MissingApplicationID
+
+        commands = self._get_all_commands(guild=guild)
+        payload = await self.get_sync_payload(guild=guild)
+
+        try:
+            if guild is None:
+                data = await self._http.bulk_upsert_global_commands(
+                    application_id,
+                    payload=payload,
+                )
+            else:
+                data = await self._http.bulk_upsert_guild_commands(
+                    application_id,
+                    guild.id,
+                    payload=payload,
+                )
+        except discord.HTTPException as e:
+            if e.status == 400 and e.code == 50035:
+                raise app_commands.CommandSyncFailure(e, commands) from None
+            raise
+
+        return [app_commands.AppCommand(data=d, state=self._state) for d in data]